@@ -0,0 +1,58 @@
+"""Per-command cost of building and serializing a Pixie command.
+
+Run with: python benchmarks/bench_encoder.py
+"""
+import json
+
+from common import load, measure, report
+
+encoder = load("encoder")
+
+KWARGS = {
+    "effect": '"Comet"',
+    "parameter1": 128,
+    "parameter2": 300,
+    "brightness": 200,
+    "rgb_color": (255, 0, 0),
+}
+
+
+def build_before(**kwargs):
+    """The dict building of PixieLight.async_set_effect before the encoder."""
+    message = {"state": "ON"}
+    message["effect"] = kwargs["effect"].strip('"').strip("'")
+
+    if "parameter1" in kwargs:
+        message["parameter1"] = min( kwargs["parameter1"], 255 )
+
+    if "parameter2" in kwargs:
+        message["parameter2"] = min( kwargs["parameter2"], 255 )
+
+    if "rgbw_color" in kwargs:
+        rgb = kwargs["rgbw_color"]
+        message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2], "w": rgb[3]}
+
+    if "rgb_color" in kwargs:
+        rgb = kwargs["rgb_color"]
+        message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2]}
+
+    if "brightness" in kwargs:
+        message["brightness"] = min( max(1, kwargs["brightness"]), 255 )
+
+    return json.dumps(message)
+
+
+def build_after(**kwargs):
+    return encoder.PixieCommand.build(True, **kwargs).encode()
+
+
+if __name__ == "__main__":
+    number = 100000
+    before = measure(lambda: build_before(**KWARGS), number)
+    after = measure(lambda: build_after(**KWARGS), number)
+    serializer = "orjson" if encoder.orjson is not None else "json"
+
+    print(f"Build and serialize a set_effect command ({serializer}):")
+    report("dict + json.dumps", before)
+    report("PixieCommand.build().encode()", after, before)
+    print(f"  payload size: {len(build_before(**KWARGS))} -> {len(build_after(**KWARGS))} bytes")
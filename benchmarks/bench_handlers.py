@@ -0,0 +1,74 @@
+"""Per-message overhead of coroutine handlers versus inline callbacks.
+
+Home Assistant runs an MQTT message callback inline if it is a plain
+function decorated with @callback, but schedules a task for every message
+if the callback is a coroutine function. This benchmark pushes the
+messages of one second at 1,000 msg/s spread over many devices through
+both kinds of handlers and measures the event loop time per message.
+
+Run with: python benchmarks/bench_handlers.py
+"""
+import asyncio
+import json
+import time
+
+from common import load
+
+parser = load("parser")
+
+DEVICES = 250
+RATE = 1000
+SECONDS = 2
+PAYLOAD = json.dumps({"state": "ON", "brightness": 200, "color": {"r": 255, "g": 64, "b": 0}, "effect": "Comet"})
+
+
+class Message:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class Channel:
+    def __init__(self):
+        self.state = None
+
+    async def async_received(self, msg):
+        self.state = parser.parse_channel_state(msg.payload)
+
+    def received(self, msg):
+        self.state = parser.parse_channel_state(msg.payload)
+
+
+async def measure_tasks():
+    """Time creating and running one task per message."""
+    channels = [Channel() for _ in range(DEVICES * 4)]
+    msg = Message("pixie_000000/channel0", PAYLOAD)
+    total = RATE * SECONDS
+    loop = asyncio.get_running_loop()
+
+    started = time.perf_counter()
+    tasks = [loop.create_task(channels[index % len(channels)].async_received(msg)) for index in range(total)]
+    await asyncio.gather(*tasks)
+    return (time.perf_counter() - started) / total
+
+
+def measure_inline():
+    channels = [Channel() for _ in range(DEVICES * 4)]
+    msg = Message("pixie_000000/channel0", PAYLOAD)
+    total = RATE * SECONDS
+
+    started = time.perf_counter()
+    for index in range(total):
+        channels[index % len(channels)].received(msg)
+    return (time.perf_counter() - started) / total
+
+
+if __name__ == "__main__":
+    print(f"{RATE} msg/s over {DEVICES} devices ({DEVICES * 4} channels) for {SECONDS} s:")
+    coroutine = min(asyncio.run(measure_tasks()) for _ in range(5))
+    inline = min(measure_inline() for _ in range(5))
+    print(f"  async def + @callback (task per message)  {coroutine * 1e9:10.0f} ns")
+    print(f"  def + @callback (inline)                  {inline * 1e9:10.0f} ns  ({coroutine / inline:5.1f}x)")
+    print(f"  event loop time at {RATE} msg/s: {coroutine * RATE * 1e3:.2f} ms/s -> {inline * RATE * 1e3:.2f} ms/s")
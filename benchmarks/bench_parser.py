@@ -0,0 +1,83 @@
+"""Parse throughput of the payloads published by Pixie devices.
+
+Run with: python benchmarks/bench_parser.py
+"""
+import json
+
+from common import load, measure, report
+
+parser = load("parser")
+
+CHANNEL_PAYLOAD = json.dumps({
+    "state": "ON",
+    "brightness": 200,
+    "color": {"r": 255, "g": 64, "b": 0},
+    "white_value": 0,
+    "parameter1": 128,
+    "parameter2": 200,
+    "effect": "Comet",
+})
+ATTRIBUTES_PAYLOAD = json.dumps({
+    "board_temperature": 41.5,
+    "uptime": 123456,
+    "firmware_version": "0.3.0",
+    "ip_addr": "192.168.1.50",
+    "mac": "AA:BB:CC:DD:EE:FF",
+    "url": "http://pixie-abcdef.local",
+})
+MALFORMED_PAYLOADS = ('{"brightness": 10}', '{"state": "ON", "color": "red"}', "not json")
+
+
+def channel_before(payload):
+    """The channel message handling of the coordinator before the parser."""
+    data = json.loads(payload)
+    picture = data["picture"] if "picture" in data else None
+    effect = data["effect"] if "effect" in data else None
+    state = data["state"].upper() == "ON"
+    if "color" in data:
+        rgb = (int(data["color"]["r"]), int(data["color"]["g"]), int(data["color"]["b"]))
+    if "parameter1" in data:
+        parameter1 = int(data["parameter1"])
+    if "parameter2" in data:
+        parameter2 = int(data["parameter2"])
+    if "brightness" in data:
+        brightness = int(data["brightness"])
+    if "white_value" in data:
+        white_value = int(data["white_value"])
+    return state
+
+
+def attributes_before(payload):
+    data = json.loads(payload)
+    values = []
+    for key in ("board_temperature", "uptime", "firmware_version", "ip_addr", "mac", "url"):
+        if key in data:
+            values.append(data[key])
+    return values
+
+
+def malformed():
+    for payload in MALFORMED_PAYLOADS:
+        parser.parse_channel_state(payload)
+
+
+if __name__ == "__main__":
+    number = 100000
+    decoder = parser.json_loads.__module__
+
+    print(f"Channel state ({len(CHANNEL_PAYLOAD)} bytes, decoder {decoder}):")
+    before = measure(lambda: channel_before(CHANNEL_PAYLOAD), number)
+    after = measure(lambda: parser.parse_channel_state(CHANNEL_PAYLOAD), number)
+    report("json.loads + dict access", before)
+    report("parse_channel_state", after, before)
+    print(f"  throughput: {1 / after:,.0f} msg/s")
+
+    print(f"Attributes ({len(ATTRIBUTES_PAYLOAD)} bytes):")
+    before = measure(lambda: attributes_before(ATTRIBUTES_PAYLOAD), number)
+    after = measure(lambda: parser.parse_attributes(ATTRIBUTES_PAYLOAD), number)
+    report("json.loads + dict access", before)
+    report("parse_attributes", after, before)
+    print(f"  throughput: {1 / after:,.0f} msg/s")
+
+    print("Malformed channel payloads:")
+    report("parse_channel_state, dropped", measure(malformed, number) / len(MALFORMED_PAYLOADS))
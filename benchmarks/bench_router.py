@@ -0,0 +1,99 @@
+"""Compare the per-topic subscriptions with the wildcard router.
+
+Run with: python benchmarks/bench_router.py
+"""
+import random
+
+from common import load, measure, report
+
+router = load("router")
+
+DEVICE_SUFFIXES = ("status", "attributes", "ota")
+CHANNEL_SUFFIXES = ("channel0", "channel1", "channel2", "channel3")
+SUFFIXES = DEVICE_SUFFIXES + CHANNEL_SUFFIXES
+MESSAGES = 10000
+
+
+def handler(topic):
+    pass
+
+
+def device_topics(count):
+    for index in range(count):
+        device = f"pixie_{index:06x}"
+        for suffix in SUFFIXES:
+            yield f"{device}/{suffix}"
+
+
+def literal_matcher(subscribed):
+    def match(topic):
+        return topic == subscribed
+    return match
+
+
+def wildcard_matcher(suffix):
+    """Match +/<suffix> the way a generic MQTT matcher does."""
+    def match(topic):
+        levels = topic.split("/")
+        return len(levels) == 2 and levels[1] == suffix
+    return match
+
+
+def run(devices):
+    topics = list(device_topics(devices))
+    messages = [random.choice(topics) for _ in range(MESSAGES)]
+
+    # Per-topic model, subscriptions matched one by one (HA before 2023.x)
+    linear = [(literal_matcher(topic), handler) for topic in topics]
+
+    def dispatch_linear():
+        for topic in messages:
+            for match, target in linear:
+                if match(topic):
+                    target(topic)
+
+    # Per-topic model, literal subscriptions looked up in a dict (current HA)
+    simple = {topic: [handler] for topic in topics}
+
+    def dispatch_simple():
+        for topic in messages:
+            for target in simple.get(topic, ()):
+                target(topic)
+
+    # Wildcard mode: one +/<suffix> subscription per suffix and the router
+    topic_router = router.PixieTopicRouter()
+    for topic in topics:
+        topic_router.add(topic, handler)
+    wildcards = [wildcard_matcher(suffix) for suffix in SUFFIXES]
+    match_route = topic_router.match
+
+    def dispatch_router():
+        for topic in messages:
+            for match in wildcards:
+                if match(topic):
+                    for target in match_route(topic):
+                        target(topic)
+
+    def dispatch_router_only():
+        for topic in messages:
+            for target in match_route(topic):
+                target(topic)
+
+    number = 1 if devices >= 1000 else 5
+    linear_time = measure(dispatch_linear, number) / MESSAGES
+    simple_time = measure(dispatch_simple, 20) / MESSAGES
+    router_time = measure(dispatch_router, 20) / MESSAGES
+    router_only_time = measure(dispatch_router_only, 20) / MESSAGES
+
+    print(f"{devices} devices: {len(topics)} per-topic subscriptions vs {len(SUFFIXES)} wildcard subscriptions")
+    report("per-topic, linear matcher (old HA)", linear_time)
+    report("per-topic, dict matcher (current HA)", simple_time)
+    report("wildcard + router", router_time)
+    report("router lookup only", router_only_time)
+    print(f"  wildcard + router costs {router_time / simple_time:.1f}x the dispatch time of current HA per message")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for devices in (10, 100, 1000):
+        run(devices)
@@ -0,0 +1,35 @@
+"""Helpers shared by the Pixie benchmarks."""
+import importlib
+import os
+import sys
+import timeit
+import types
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custom_components", "pixie"
+)
+
+
+def load(module):
+    """Import a module of the integration which does not need Home Assistant.
+
+    The package __init__ sets up Home Assistant platforms, so the package is
+    registered without running it and only the requested module is imported.
+    """
+    if "pixie" not in sys.modules:
+        package = types.ModuleType("pixie")
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules["pixie"] = package
+    return importlib.import_module(f"pixie.{module}")
+
+
+def measure(func, number):
+    """Return the best time per call of func in seconds."""
+    return min(timeit.Timer(func).repeat(repeat=5, number=number)) / number
+
+
+def report(name, seconds, baseline=None):
+    line = f"  {name:<40} {seconds * 1e9:10.0f} ns"
+    if baseline:
+        line += f"  ({baseline / seconds:5.1f}x)"
+    print(line)
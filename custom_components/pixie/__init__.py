@@ -2,6 +2,8 @@
 
 import logging
 
+import voluptuous as vol
+
 from homeassistant.components.light import DOMAIN as LIGHT_DOMAIN
 from homeassistant.components.select import DOMAIN as SELECT_DOMAIN
 from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
@@ -10,14 +12,53 @@ from homeassistant.components.update import DOMAIN as UPDATE_DOMAIN
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.entity_registry import async_migrate_entries
 from homeassistant.components import mqtt
 
 from .coordinator import PixieCoordinator
+from .hub import async_get_hub, async_release_hub
+from .bootstrap import PixieBootstrapScheduler
+from .store import PixieStateStore, PixieSnapshotStore
+from .subscription import PixieWildcardSubscriber
+from .watchdog import PixieWatchdog
+from .services import async_setup_services
 from .const import (
     DOMAIN,
     CONF_DEVICE_ID,
     CONF_CHANNEL,
+    CONF_WILDCARD_SUBSCRIPTION,
+    CONF_COMMAND_WINDOW,
+    DEFAULT_COMMAND_WINDOW,
+    CONF_RATE_LIMIT,
+    DEFAULT_RATE_LIMIT,
+    CONF_RATE_LIMIT_BURST,
+    DEFAULT_RATE_LIMIT_BURST,
+    CONF_DELTA_COMMANDS,
+    CONF_BOOTSTRAP_WINDOW,
+    DEFAULT_BOOTSTRAP_WINDOW,
+    CONF_AUTO_ADD_DISCOVERED,
+    CONF_RETAINED_STATE,
+    CONF_GROUP_LIGHT,
+    CONF_COMBINED_COMMANDS,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    CONF_OFFLINE_COMMAND_TTL,
+    DEFAULT_OFFLINE_COMMAND_TTL,
+    CONF_AVAILABILITY_TIMEOUT,
+    CONF_AVAILABILITY_PROBE,
+    CONF_TEMPERATURE_DEADBAND,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    CONF_TEMPERATURE_INTERVAL,
+    DEFAULT_TEMPERATURE_INTERVAL,
+    CONF_TEMPERATURE_STATISTICS_WINDOW,
+    DATA_CONFIG,
+    DATA_WILDCARD,
+    DATA_STORE,
+    DATA_BOOTSTRAP,
+    DATA_SNAPSHOTS,
+    DATA_WATCHDOG,
     PIXIE_ATTR_STATE,
     PIXIE_ATTR_TRANSITION_NAME,
     PIXIE_ATTR_TRANSITION,
@@ -39,6 +80,65 @@ PLATFORMS = [LIGHT_DOMAIN, SELECT_DOMAIN, SENSOR_DOMAIN, UPDATE_DOMAIN]
 
 _LOGGER = logging.getLogger(__name__)
 
+PIXIE_CONFIG_SCHEMA = vol.Schema({
+    vol.Optional(CONF_WILDCARD_SUBSCRIPTION, default=False): cv.boolean,
+    vol.Optional(CONF_COMMAND_WINDOW, default=DEFAULT_COMMAND_WINDOW): vol.All( vol.Coerce(int), vol.Range(min=0, max=1000) ),
+    vol.Optional(CONF_RATE_LIMIT, default=DEFAULT_RATE_LIMIT): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+    vol.Optional(CONF_RATE_LIMIT_BURST, default=DEFAULT_RATE_LIMIT_BURST): vol.All( vol.Coerce(int), vol.Range(min=1) ),
+    vol.Optional(CONF_DELTA_COMMANDS, default=False): cv.boolean,
+    vol.Optional(CONF_BOOTSTRAP_WINDOW, default=DEFAULT_BOOTSTRAP_WINDOW): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+    vol.Optional(CONF_AUTO_ADD_DISCOVERED, default=False): cv.boolean,
+    vol.Optional(CONF_RETAINED_STATE, default=False): cv.boolean,
+    vol.Optional(CONF_GROUP_LIGHT, default=False): cv.boolean,
+    vol.Optional(CONF_COMBINED_COMMANDS, default=False): cv.boolean,
+    vol.Optional(CONF_OPTIMISTIC, default=False): cv.boolean,
+    vol.Optional(CONF_OPTIMISTIC_TIMEOUT, default=DEFAULT_OPTIMISTIC_TIMEOUT): vol.All( vol.Coerce(float), vol.Range(min=0.1) ),
+    vol.Optional(CONF_AVAILABILITY_TIMEOUT, default=0): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+    vol.Optional(CONF_AVAILABILITY_PROBE, default=False): cv.boolean,
+    vol.Optional(CONF_TEMPERATURE_DEADBAND, default=DEFAULT_TEMPERATURE_DEADBAND): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+    vol.Optional(CONF_TEMPERATURE_INTERVAL, default=DEFAULT_TEMPERATURE_INTERVAL): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+    vol.Optional(CONF_TEMPERATURE_STATISTICS_WINDOW, default=0): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+    vol.Optional(CONF_OFFLINE_COMMAND_TTL, default=DEFAULT_OFFLINE_COMMAND_TTL): vol.All( vol.Coerce(float), vol.Range(min=0) ),
+})
+
+CONFIG_SCHEMA = vol.Schema(
+    { vol.Optional(DOMAIN, default={}): PIXIE_CONFIG_SCHEMA },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup(hass: HomeAssistant, config) -> bool:
+    """Set up the integration-wide options of Pixie."""
+
+    conf = config.get(DOMAIN)
+    if conf is None:
+        conf = PIXIE_CONFIG_SCHEMA({})
+    hass.data[DATA_CONFIG] = conf
+
+    store = PixieStateStore(hass)
+    await store.async_load()
+    hass.data[DATA_STORE] = store
+
+    snapshots = PixieSnapshotStore(hass)
+    await snapshots.async_load()
+    hass.data[DATA_SNAPSHOTS] = snapshots
+
+    hass.data[DATA_BOOTSTRAP] = PixieBootstrapScheduler(hass, conf[CONF_BOOTSTRAP_WINDOW])
+
+    if conf[CONF_WILDCARD_SUBSCRIPTION]:
+        _LOGGER.info("Receive the messages of all Pixie devices over shared wildcard subscriptions")
+        hass.data[DATA_WILDCARD] = PixieWildcardSubscriber(hass)
+
+    if conf[CONF_AVAILABILITY_TIMEOUT] > 0:
+        hass.data[DATA_WATCHDOG] = PixieWatchdog(
+            hass.loop, conf[CONF_AVAILABILITY_TIMEOUT], conf[CONF_AVAILABILITY_PROBE]
+        )
+
+    async_setup_services(hass)
+
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up a pixie light from a config entry."""
 
@@ -47,7 +147,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = entry.data
 
-    coordinator = PixieCoordinator(hass, entry)
+    hub = async_get_hub(hass, entry.data[CONF_DEVICE_ID])
+    coordinator = PixieCoordinator(hass, entry, hub)
+    hub.add_coordinator(coordinator)
     ##c_key = f"coordinator_{entry.entry_id}"
     ##hass.data[DOMAIN][c_key] = coordinator
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
@@ -61,9 +163,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
-        c_key = f"coordinator_{entry.entry_id}"
-        hass.data[DOMAIN].pop(c_key)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator.async_shutdown()
+
+        hub = coordinator.hub()
+        hub.remove_coordinator(coordinator)
+        async_release_hub(hass, hub)
 
         if not hass.data[DOMAIN]:
             hass.services.async_remove(domain=DOMAIN, service=SERVICE_SET_EFFECT)
@@ -73,3 +178,10 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     return unload_ok
 
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the cached state of a removed channel."""
+    store = hass.data.get(DATA_STORE)
+    if store is not None:
+        store.async_remove_channel(entry.data[CONF_DEVICE_ID], entry.data[CONF_CHANNEL])
+
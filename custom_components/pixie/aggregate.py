@@ -0,0 +1,45 @@
+"""Aggregation of sensor samples over fixed time windows."""
+
+
+class PixieWindowAggregate:
+    """Minimum, maximum and mean of the samples of fixed time windows.
+
+    Only running sums are kept, not the samples. The summary is the one of
+    the last completed window.
+    """
+
+    def __init__(self, window):
+        self._window = window
+        self._start = None
+        self._min = None
+        self._max = None
+        self._total = 0.0
+        self._count = 0
+        self._summary = None
+
+    def add(self, now, value):
+        """Add a sample, return True if it has closed a window."""
+        closed = False
+        if self._start is None or now - self._start >= self._window:
+            if self._count:
+                closed = True
+                self._summary = {
+                    "min": self._min,
+                    "max": self._max,
+                    "mean": round(self._total / self._count, 2),
+                    "samples": self._count,
+                }
+            self._start = now
+            self._min = self._max = value
+            self._total = 0.0
+            self._count = 0
+
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+        self._total += value
+        self._count += 1
+        return closed
+
+    def summary(self):
+        """Return the statistics of the last completed window, None before the first one."""
+        return self._summary
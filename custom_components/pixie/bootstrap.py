@@ -0,0 +1,99 @@
+"""Staggered startup requests of Pixie devices."""
+import logging
+import random
+
+from homeassistant.core import CoreState, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PixieBootstrapScheduler:
+    """Spread the initial state and attribute requests over a window.
+
+    At Home Assistant start every device gets a random delay within the
+    window and all bootstrap requests of the device are sent after it, so
+    hundreds of devices do not answer within the same few hundred
+    milliseconds. Devices added while Home Assistant is running are
+    requested immediately. The scheduler also measures how long it takes
+    until every device scheduled at start has answered or has been given up
+    because it is offline or did not answer the requests.
+    """
+
+    def __init__(self, hass, window):
+        self.hass = hass
+        self._window = window
+        self._delays = {}
+        self._waiting = set()
+        self._started = None
+        self._warmup_duration = None
+        self._ready = 0
+        self._gave_up = 0
+
+    @callback
+    def async_schedule(self, device_id, job):
+        """Run a coroutine function after the delay of a device.
+
+        Return a function cancelling the request.
+        """
+        if self.hass.state is CoreState.running or self._window <= 0:
+            self.hass.async_create_task(job())
+            return lambda: None
+
+        if self._started is None:
+            self._started = self.hass.loop.time()
+        self._waiting.add(device_id)
+
+        delay = self._delays.get(device_id)
+        if delay is None:
+            delay = self._delays[device_id] = random.uniform(0, self._window)
+
+        timer = self.hass.loop.call_later(delay, self._run, job)
+        return timer.cancel
+
+    def _run(self, job):
+        self.hass.async_create_task(job())
+
+    @callback
+    def async_device_ready(self, device_id):
+        """Mark a device as warmed up once it answered for the first time."""
+        if device_id not in self._waiting:
+            return
+
+        self._waiting.discard(device_id)
+        self._ready += 1
+        self._async_check_warmed_up()
+
+    @callback
+    def async_device_gave_up(self, device_id):
+        """Stop waiting for a device which is offline or does not answer."""
+        if device_id not in self._waiting:
+            return
+
+        _LOGGER.debug("[%s] The device has not answered, the warm-up does not wait for it", device_id)
+        self._waiting.discard(device_id)
+        self._gave_up += 1
+        self._async_check_warmed_up()
+
+    @callback
+    def _async_check_warmed_up(self):
+        if self._waiting:
+            return
+
+        self._warmup_duration = self.hass.loop.time() - self._started
+        _LOGGER.info(
+            "Warm-up of %s Pixie devices took %.1f s, %s of them did not answer",
+            self._ready + self._gave_up, self._warmup_duration, self._gave_up,
+        )
+
+    def waiting_devices(self):
+        return len(self._waiting)
+
+    def ready_devices(self):
+        return self._ready
+
+    def gave_up_devices(self):
+        return self._gave_up
+
+    def warmup_duration(self):
+        """Return the seconds until all devices answered, None while warming up."""
+        return self._warmup_duration
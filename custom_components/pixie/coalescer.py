@@ -0,0 +1,63 @@
+"""Latest-wins coalescing of the commands sent to a Pixie channel."""
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PixieCommandCoalescer:
+    """Send at most one PixieCommand per window and merge the ones in between.
+
+    The first command after an idle period is sent immediately. Commands
+    received during the window are merged field by field and the result is
+    sent when the window ends, so the final value is never lost.
+    """
+
+    def __init__(self, hass, window, publish):
+        self.hass = hass
+        self._window = window
+        self._publish = publish
+        self._pending = None
+        self._pending_qos = 0
+        self._pending_retain = False
+        self._timer = None
+        self._coalesced = 0
+
+    async def async_submit(self, command, qos, retain):
+        """Send a command now or merge it into the pending one."""
+        if self._window <= 0:
+            await self._publish(command, qos, retain)
+            return
+
+        if self._timer is None:
+            self._timer = self.hass.loop.call_later(self._window, self._flush)
+            await self._publish(command, qos, retain)
+            return
+
+        if self._pending is None:
+            self._pending = command.copy()
+        else:
+            self._pending.merge(command)
+            self._coalesced += 1
+        self._pending_qos = qos
+        self._pending_retain = retain
+
+    def _flush(self):
+        self._timer = None
+        if self._pending is None:
+            return
+
+        command = self._pending
+        self._pending = None
+        self._timer = self.hass.loop.call_later(self._window, self._flush)
+        self.hass.async_create_task(self._publish(command, self._pending_qos, self._pending_retain))
+
+    def cancel(self):
+        """Drop the pending command and stop the window timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+
+    def coalesced(self):
+        """Return the number of commands merged into a later one."""
+        return self._coalesced
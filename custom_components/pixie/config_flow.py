@@ -1,17 +1,29 @@
 """Config flow for the Pixie platform."""
 import logging
+import re
 
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import discovery_flow
 
 from .const import (
     DOMAIN,
     CONF_DEVICE_ID,
     CONF_CHANNEL,
-    CONF_NAME
+    CONF_CHANNELS,
+    CONF_NAME,
+    CONF_AUTO_ADD_DISCOVERED,
+    DATA_CONFIG,
+    PIXIE_CHANNELS,
     )
 
+_LOGGER = logging.getLogger(__name__)
+
+# The status (LWT) topic of a device matched by the mqtt discovery filter of the manifest
+DISCOVERY_TOPIC = re.compile(r"^pixie_([0-9A-Fa-f]{6})/status$")
+
 
 class PixieConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow."""
@@ -21,6 +33,8 @@ class PixieConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._errors = {}
+        self._device_id = None
+        self._channels = []
 
     async def async_step_user(self, user_input=None):
         """Step when user initializes a integration."""
@@ -63,3 +77,82 @@ class PixieConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Import a config entry."""
         return await self.async_step_user(user_input)
 
+
+    async def async_step_mqtt(self, discovery_info):
+        """Handle a device found by the MQTT discovery."""
+        match = DISCOVERY_TOPIC.match(discovery_info.topic)
+        if match is None:
+            return self.async_abort(reason="not_pixie_device")
+
+        device_id = match.group(1)
+        # One flow per device, repeated status messages must not propose it twice
+        await self.async_set_unique_id(f"pixie_{device_id}")
+        # The MQTT discovery stops listening to the whole discovery topic when a
+        # flow aborts with already_configured, a single device must not use it
+        for entry in self._async_current_entries(include_ignore=True):
+            if entry.source == config_entries.SOURCE_IGNORE and entry.unique_id == self.unique_id:
+                return self.async_abort(reason="device_ignored")
+
+        self._channels = self._unconfigured_channels(device_id, PIXIE_CHANNELS)
+        if not self._channels:
+            return self.async_abort(reason="all_channels_configured")
+
+        self._device_id = device_id
+        self.context["title_placeholders"] = {CONF_DEVICE_ID: device_id}
+
+        config = self.hass.data.get(DATA_CONFIG, {})
+        if config.get(CONF_AUTO_ADD_DISCOVERED, False):
+            return await self._async_create_channels(self._channels)
+
+        return await self.async_step_confirm()
+
+    def _unconfigured_channels(self, device_id, channels):
+        configured = {entry.unique_id for entry in self._async_current_entries(include_ignore=False)}
+        return [channel for channel in channels if f"pixie_{device_id}_{channel}" not in configured]
+
+    async def async_step_confirm(self, user_input=None):
+        """Let the user select the channels of a discovered device."""
+        self._errors = {}
+
+        if user_input is not None:
+            channels = sorted(int(channel) for channel in user_input[CONF_CHANNELS])
+            if channels:
+                return await self._async_create_channels(channels)
+            self._errors["base"] = "no_channels"
+
+        options = {str(channel): f"Channel {channel}" for channel in self._channels}
+        return self.async_show_form(
+            step_id="confirm",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_CHANNELS, default=list(options)): cv.multi_select(options),
+                }
+            ),
+            description_placeholders={CONF_DEVICE_ID: self._device_id},
+            errors=self._errors,
+        )
+
+    async def _async_create_channels(self, channels):
+        """Create the entries of the channels of the discovered device.
+
+        A flow creates a single entry, so the first channel is created by this
+        flow and the others are imported. The import flows are queued with the
+        discovery flows, Home Assistant starts them in batches.
+        """
+        device_id = self._device_id
+        # Channels may have been added while the flow waited for the user
+        channels = self._unconfigured_channels(device_id, channels)
+        if not channels:
+            return self.async_abort(reason="all_channels_configured")
+
+        _LOGGER.info("Add the discovered device %s; channels %s;", device_id, channels)
+
+        for channel in channels[1:]:
+            discovery_flow.async_create_flow(
+                self.hass,
+                DOMAIN,
+                context={"source": config_entries.SOURCE_IMPORT},
+                data={CONF_DEVICE_ID: device_id, CONF_CHANNEL: channel},
+            )
+
+        return await self.async_step_user({CONF_DEVICE_ID: device_id, CONF_CHANNEL: channels[0]})
@@ -5,6 +5,52 @@ DOMAIN = "pixie"
 CONF_DEVICE_ID = "device_id"
 CONF_CHANNEL = "channel"
 CONF_NAME = "name"
+CONF_WILDCARD_SUBSCRIPTION = "wildcard_subscription"
+CONF_COMMAND_WINDOW = "command_window"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_RATE_LIMIT_BURST = "rate_limit_burst"
+CONF_DELTA_COMMANDS = "delta_commands"
+CONF_BOOTSTRAP_WINDOW = "bootstrap_window"
+CONF_AUTO_ADD_DISCOVERED = "auto_add_discovered"
+CONF_RETAINED_STATE = "retained_state"
+CONF_GROUP_LIGHT = "group_light"
+CONF_COMBINED_COMMANDS = "combined_commands"
+CONF_OPTIMISTIC = "optimistic"
+CONF_OPTIMISTIC_TIMEOUT = "optimistic_timeout"
+CONF_OFFLINE_COMMAND_TTL = "offline_command_ttl"
+CONF_AVAILABILITY_TIMEOUT = "availability_timeout"
+CONF_AVAILABILITY_PROBE = "availability_probe"
+CONF_TEMPERATURE_DEADBAND = "temperature_deadband"
+CONF_TEMPERATURE_INTERVAL = "temperature_interval"
+CONF_TEMPERATURE_STATISTICS_WINDOW = "temperature_statistics_window"
+CONF_CHANNELS = "channels"
+
+PIXIE_CHANNELS = [0, 1, 2, 3]
+
+DEFAULT_COMMAND_WINDOW = 50
+DEFAULT_RATE_LIMIT = 10
+DEFAULT_RATE_LIMIT_BURST = 10
+DEFAULT_BOOTSTRAP_WINDOW = 5
+DEFAULT_OPTIMISTIC_TIMEOUT = 3
+DEFAULT_OFFLINE_COMMAND_TTL = 300
+DEFAULT_TEMPERATURE_DEADBAND = 0.5
+DEFAULT_TEMPERATURE_INTERVAL = 60
+
+# Seconds after which a command without a matching state is not measured anymore
+COMMAND_LATENCY_TIMEOUT = 30
+
+# Seconds the boot time derived from the uptime may move without a reboot
+BOOT_TIME_TOLERANCE = 30
+
+# Seconds to wait for the retained state before the state is requested
+RETAINED_STATE_WAIT = 1
+
+DATA_CONFIG = "pixie_config"
+DATA_WILDCARD = "pixie_wildcard"
+DATA_STORE = "pixie_store"
+DATA_BOOTSTRAP = "pixie_bootstrap"
+DATA_SNAPSHOTS = "pixie_snapshots"
+DATA_WATCHDOG = "pixie_watchdog"
  
 PIXIE_ATTR_STATE = "state"
 PIXIE_ATTR_PICTURE = "picture"
@@ -14,6 +60,11 @@ PIXIE_ATTR_EFFECT = "effect"
 PIXIE_ATTR_PARAMETER1 = "parameter1"
 PIXIE_ATTR_PARAMETER2 = "parameter2"
 PIXIE_ATTR_BRIGHTNESS = "brightness"
+PIXIE_ATTR_WHITE_VALUE = "white_value"
+PIXIE_ATTR_COLOR = "color"
+PIXIE_ATTR_RGB_COLOR = "rgb_color"
+PIXIE_ATTR_RGBW_COLOR = "rgbw_color"
+PIXIE_ATTR_CHANNELS = "channels"
 PIXIE_ATTR_BOARD_TEMPERATURE = "board_temperature"
 PIXIE_ATTR_UPTIME = "uptime"
 PIXIE_ATTR_FIRMWARE_VERSION = "firmware_version"
@@ -28,6 +79,17 @@ SERVICE_SET_PICTURE = "set_picture"
 SERVICE_TURN_ON_TRANSITION = "turn_on_transition"
 SERVICE_TURN_OFF_TRANSITION = "turn_off_transition"
 SERVICE_CHECK_OTA = "check_ota"
+SERVICE_SET_CHANNELS = "set_channels"
+SERVICE_APPLY_SCENE = "apply_scene"
+SERVICE_SNAPSHOT = "snapshot"
+SERVICE_RESTORE = "restore"
+
+CONF_ENTITIES = "entities"
+CONF_MAX_PARALLEL = "max_parallel"
+CONF_PERSIST = "persist"
+DEFAULT_MAX_PARALLEL = 16
+
+EVENT_SCENE_APPLIED = "pixie_scene_applied"
 
 
 PIXIE_EFFECT_LIST = [
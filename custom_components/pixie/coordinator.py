@@ -1,7 +1,6 @@
+import asyncio
 import logging
-
-import json
-import voluptuous as vol
+from collections import deque
 
 from homeassistant.const import CONF_ICON, CONF_NAME
 from homeassistant.components.select import SelectEntity
@@ -25,10 +24,26 @@ from homeassistant.components.light import (
 )
 
 
+from .coalescer import PixieCommandCoalescer
+from .encoder import dumps
+from .parser import parse_channel_state
+from .ratelimit import PRIORITY_HIGH, PRIORITY_NORMAL
+from .subscription import PixieSubscriptionRegistry
 from .const import (
     DOMAIN,
     CONF_DEVICE_ID,
     CONF_CHANNEL,
+    CONF_COMMAND_WINDOW,
+    CONF_DELTA_COMMANDS,
+    CONF_RETAINED_STATE,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_OFFLINE_COMMAND_TTL,
+    DATA_CONFIG,
+    DATA_STORE,
+    DATA_BOOTSTRAP,
+    RETAINED_STATE_WAIT,
+    COMMAND_LATENCY_TIMEOUT,
     PIXIE_ATTR_STATE,
     PIXIE_ATTR_TRANSITION_NAME,
     PIXIE_ATTR_TRANSITION,
@@ -37,12 +52,8 @@ from .const import (
     PIXIE_ATTR_PARAMETER1,
     PIXIE_ATTR_PARAMETER2,
     PIXIE_ATTR_BRIGHTNESS,
-    PIXIE_ATTR_BOARD_TEMPERATURE,
-    PIXIE_ATTR_UPTIME,
-    PIXIE_ATTR_FIRMWARE_VERSION,
-    PIXIE_ATTR_MAC,
-    PIXIE_ATTR_IP_ADDR,
-    PIXIE_ATTR_URL,
+    PIXIE_ATTR_WHITE_VALUE,
+    PIXIE_ATTR_COLOR,
     SERVICE_SET_PICTURE,
     SERVICE_SET_EFFECT,
     SERVICE_TURN_ON_TRANSITION,
@@ -56,8 +67,9 @@ _LOGGER = logging.getLogger(__name__)
 
 class PixieCoordinator:
     """Class to manage fetching Pixie data from a single endpoint"""
-    def __init__(self, hass, config_entry):
+    def __init__(self, hass, config_entry, hub):
         self.hass = hass
+        self._hub = hub
 
         self._state = False
         self._brightness = 255
@@ -68,48 +80,65 @@ class PixieCoordinator:
         self._rgb = (255, 255, 255)
         self._picture = None
         self._effect = None
-        self._available = False
-        self._board_temperature = None
-        self._uptime = None
         self._device_id = config_entry.data[CONF_DEVICE_ID]
         self._channel = config_entry.data[CONF_CHANNEL]
-        self._firmware_version = None
-        self._ip_addr = None
-        self._mac = None
-        self._url = None
- 
-        self._available_version = None
-        self._available_version_int = 0
-        self._firmware_version_int = 0
-        self._ota_state = None
-        self._ota_in_progress = False
 
         self.qos = 0
         self.retain = False
-        self.availability_topic = f"pixie_{self._device_id}/status"
         self.channel_topic = f"pixie_{self._device_id}/channel{self._channel}"
         self.request_topic = f"pixie_{self._device_id}/channel{self._channel}/get"
         self.command_topic = f"pixie_{self._device_id}/channel{self._channel}/set"
-        self.attribute_request_topic = f"pixie_{self._device_id}/attributes/get"
-        self.attribute_topic = f"pixie_{self._device_id}/attributes"
-        self.all_channels_topic = f"pixie_{self._device_id}/channel"
-        self.ota_check_topic = f"pixie_{self._device_id}/ota/check"
-        self.ota_perform_topic = f"pixie_{self._device_id}/ota/perform"
-        self.ota_reply_topic = f"pixie_{self._device_id}/ota"
+        # Retained copy of the channel state kept by the integration
+        self.retained_topic = f"pixie_{self._device_id}/channel{self._channel}/retained"
 
         self._light_state_callback = None
         self._availability_callback = None
-        self._uptime_callback = None
         self._board_temp_callback = None
         self._picture_callback = None
         self._effect_callback = None
         self._attr_callback = None
         self._ota_callback = None
 
-        _LOGGER.info("Set up a coordinator for the device %s; channel %s;", self._device_id, self._channel)
+        self._subscriptions = PixieSubscriptionRegistry(hass, self.qos)
+
+        config = hass.data[DATA_CONFIG]
+        self._delta_commands = config[CONF_DELTA_COMMANDS]
+        self._retained_state = config[CONF_RETAINED_STATE]
+        self._state_received = False
+        # Until the device itself reports the state, the known one may be restored or retained
+        self._state_confirmed = False
+        # Until a retained copy of the state is known to exist
+        self._mirror_outdated = True
+        self._in_flight = {}
+        self._optimistic = config[CONF_OPTIMISTIC]
+        self._optimistic_timeout = config[CONF_OPTIMISTIC_TIMEOUT]
+        # The values confirmed by the device while an optimistic state is shown
+        self._confirmed_values = None
+        self._rollback_timer = None
+        # The latest command merged while the device is offline
+        self._offline_command_ttl = config[CONF_OFFLINE_COMMAND_TTL]
+        self._offline_command = None
+        self._offline_held = 0
+        self._offline_superseded = 0
+        self._offline_expired = 0
+        self._offline_flushed = 0
+        # Sent commands waiting for a state which reflects them, oldest first
+        self._sent_commands = deque(maxlen=8)
+        self._coalescer = PixieCommandCoalescer(
+            hass, config[CONF_COMMAND_WINDOW] / 1000, self._async_send_command
+        )
+
+        self._bootstrap = hass.data[DATA_BOOTSTRAP]
+        self._cancel_request = None
+
+        # Show the last known state until the device answers
+        self._store = hass.data[DATA_STORE]
+        restored = self._store.channel(self._device_id, self._channel)
+        if restored is not None:
+            self.restore(restored)
+        self._store.async_track_channel(self._device_id, self._channel, self.snapshot)
 
-    def uptime_sensor_callback(self, callback=None):
-        self._uptime_callback = callback
+        _LOGGER.info("Set up a coordinator for the device %s; channel %s;", self._device_id, self._channel)
 
     def board_temp_sensor_callback(self, callback=None):
         self._board_temp_callback = callback
@@ -130,195 +159,475 @@ class PixieCoordinator:
         self._ota_callback = callback
 
     async def async_mqtt_handler(self):
-        """Subscribe to MQTT events."""
-        @callback
-        async def availability_received(msg):
-            _LOGGER.debug("[%s] MQTT availability message received: %s", self._device_id, msg.payload)
-            if msg.payload == "online":
-                self._available = True
-            else:
-                self._available = False
-
-            if self._light_state_callback != None:
-                self._light_state_callback()
-
-            if self._uptime_callback != None:
-                self._uptime_callback()
-
-            if self._board_temp_callback != None:
-                self._board_temp_callback()
-
-            if self._picture_callback != None:
-                self._picture_callback()
-
-            if self._effect_callback != None:
-                self._effect_callback()
-
-        @callback
-        async def attribute_message_received(msg):
-            _LOGGER.debug("[%s] MQTT attribute message received: %s", self._device_id, msg.payload)
-            try:
-                data = json.loads(msg.payload)
-            except vol.MultipleInvalid as error:
-                _LOGGER.warning("[%s] Skipping update because of malformatted data: %s", self._device_id, error)
-                return
-
-            if PIXIE_ATTR_BOARD_TEMPERATURE in data:
-                self._board_temperature = data[PIXIE_ATTR_BOARD_TEMPERATURE]
-                if self._board_temp_callback != None:
-                    self._board_temp_callback()
-
-            if PIXIE_ATTR_UPTIME in data:
-                self._uptime = data[PIXIE_ATTR_UPTIME]
-                if self._uptime_callback != None:
-                    self._uptime_callback()
-
-            if PIXIE_ATTR_FIRMWARE_VERSION in data:
-                self._firmware_version = data[PIXIE_ATTR_FIRMWARE_VERSION]
-                if self._firmware_version != None:
-                    self._attr_callback()
-
-            if PIXIE_ATTR_IP_ADDR in data:
-                self._ip_addr = data[PIXIE_ATTR_IP_ADDR]
-                if self._ip_addr != None:
-                    self._attr_callback()
-
-            if PIXIE_ATTR_MAC in data:
-                self._mac = data[PIXIE_ATTR_MAC]
-                if self._mac != None:
-                    self._attr_callback()
-
-            if PIXIE_ATTR_URL in data:
-                self._url = data[PIXIE_ATTR_URL]
-                if self._url != None:
-                    self._attr_callback()
-
-
-        @callback
-        async def message_received(msg):
-            """Run when new MQTT message has been received."""
-
-            _LOGGER.debug("[%s] MQTT message received: %s", self._device_id, msg.payload)
-            try:
-                data = json.loads(msg.payload)
-            except vol.MultipleInvalid as error:
-                _LOGGER.warning("[%s] Skipping update because of malformatted data: %s", self._device_id, error)
-                return
-
-            if PIXIE_ATTR_PICTURE in data:
-                self._picture = data[PIXIE_ATTR_PICTURE]
-            else:
-                self._picture = None
-
-            if PIXIE_ATTR_EFFECT in data:
-                self._effect = data[PIXIE_ATTR_EFFECT]
-            else:
-                self._effect = None
-
-            if data["state"].upper() == "ON":
-                self._state = True
-            elif data["state"].upper() == "OFF":
-                self._state = False
-
-            if "color" in data:
-                r = int(data["color"]["r"])  # pylint: disable=invalid-name
-                g = int(data["color"]["g"])  # pylint: disable=invalid-name
-                b = int(data["color"]["b"])  # pylint: disable=invalid-name
-                self._rgb = (r, g, b)
-
-            if "parameter1" in data:
-                self._parameter1 = int(data["parameter1"])
-
-            if "parameter2" in data:
-                self._parameter2 = int(data["parameter2"])
-
-            if "brightness" in data:
-                self._brightness = int(data["brightness"])
-
-            if "white_value" in data:
-                self._white_value = int(data["white_value"])
-
-            if self._effect_callback != None:
-                self._effect_callback()
-
-            if self._picture_callback != None:
-                self._picture_callback()
-
-            if self._light_state_callback != None:
-                self._light_state_callback()
-        
-        @callback
-        async def ota_message_received(msg):
-            _LOGGER.debug("[%s] MQTT OTA message received: %s", self._device_id, msg.payload)
-            try:
-                data = json.loads(msg.payload)
-            except vol.MultipleInvalid as error:
-                _LOGGER.warning("[%s] Skipping update because of malformatted data: %s", self._device_id, error)
-                return
-            
-            if ("ota_state" in data) and ("ota_type" in data) and ("result" in data):
-                if data["ota_state"] == "start" and data["ota_type"] == "update" and data["result"] == 1:
-                    self._ota_in_progress = True
-                    _LOGGER.info("[%s] OTA update has started", self._device_id)
-                elif data["ota_state"] == "end" and data["ota_type"] == "update" and data["result"] == 1:
-                    self._ota_in_progress = False
-                    self._firmware_version = self._available_version
-                    _LOGGER.info("[%s] OTA update has finished", self._device_id)
-                elif data["ota_state"] == "end" and data["ota_type"] == "update" and data["result"] != 1:
-                    _LOGGER.warning("[%s] OTA update has failed", self._device_id)
-                    self._ota_in_progress = False
-                elif data["ota_state"] == "end" and data["ota_type"] == "check" and data["result"] != 1:
-                    _LOGGER.warning("[%s] OTA check update has failed", self._device_id)
-                elif data["ota_state"] == "end" and data["ota_type"] == "check" and data["result"] == 1:
-
-                    if "remote_version" in data:
-                        rmt_ver = data["remote_version"].split('.')
-                        if len(rmt_ver) == 3:
-                            self._available_version_int = 100 * int(rmt_ver[0]) + 10 * int(rmt_ver[1]) + int(rmt_ver[2])
-                            self._available_version = data["remote_version"]
-                            _LOGGER.debug("[%s] Available firmware version: %s", self._device_id, self._available_version)
-
-                    if "running_version" in data:
-                        run_ver = data["running_version"].split('.')
-                        if len(run_ver) == 3:
-                            self._firmware_version_int = 100 * int(run_ver[0]) + 10 * int(run_ver[1]) + int(run_ver[2])
-                            self._firmware_version = data["running_version"]
-                            _LOGGER.debug("[%s] Running firmware version: %s", self._device_id, self._firmware_version)
-            else:
-                _LOGGER.warning("[%s]: Malformatted OTA message received: %s", self._device_id, msg.payload)
-
-            if self._ota_callback != None:
-                self._ota_callback()
-
-        _LOGGER.info("Subscribe to the topic %s", self.availability_topic)
-        await mqtt.async_subscribe( self.hass, self.availability_topic, availability_received, self.qos )
-
-        _LOGGER.info("Subscribe to the topic %s", self.attribute_topic)
-        await mqtt.async_subscribe( self.hass, self.attribute_topic, attribute_message_received, self.qos )
-
-        _LOGGER.info("Subscribe to the topic %s", self.channel_topic)
-        await mqtt.async_subscribe( self.hass, self.channel_topic, message_received, self.qos )
-
-        _LOGGER.info("Subscribe to the topic %s", self.ota_reply_topic)
-        await mqtt.async_subscribe( self.hass, self.ota_reply_topic, ota_message_received, self.qos )
-
+        """Subscribe to MQTT events on behalf of an entity.
+
+        The channel topic is subscribed once per coordinator and the device
+        topics once per device, further calls only count the entities using
+        them.
+        """
+        await self._hub.async_mqtt_handler()
+
+        if self._retained_state:
+            await self._subscriptions.async_subscribe(self.retained_topic, self._retained_message_received)
+
+        if await self._subscriptions.async_subscribe(self.channel_topic, self._message_received):
+            self._cancel_request = self._bootstrap.async_schedule(self._device_id, self._async_request_state)
+
+    async def _async_request_state(self):
+        self._cancel_request = None
+        if self._retained_state and not self._state_received:
+            # The retained state arrives right after the subscription
+            await asyncio.sleep(RETAINED_STATE_WAIT)
+        if self._state_received:
+            _LOGGER.debug("[%s] The state of the channel %s is known, skipping the request", self._device_id, self._channel)
+            return
+        await self._hub.async_request(self.request_topic, self._async_publish_state_request)
+
+    async def _async_publish_state_request(self):
         _LOGGER.info("Request the current state over the topic %s", self.request_topic)
         await mqtt.async_publish( self.hass, self.request_topic, "1", self.qos, False )
 
-        _LOGGER.info("Request the attributes over the topic %s", self.attribute_request_topic)
-        await mqtt.async_publish( self.hass, self.attribute_request_topic, "1", self.qos, False )
+    @callback
+    def async_request_state(self):
+        """Request the current state of the channel again."""
+        self.hass.async_create_task(
+            self._hub.async_request(self.request_topic, self._async_publish_state_request)
+        )
+
+    @callback
+    def async_mqtt_release(self):
+        """Release the MQTT topics used by an entity which is being removed."""
+        self._subscriptions.async_release(self.channel_topic)
+        if self._retained_state:
+            self._subscriptions.async_release(self.retained_topic)
+        self._hub.async_mqtt_release()
+
+    @callback
+    def async_shutdown(self):
+        """Unsubscribe from all MQTT topics and drop the pending commands."""
+        self._subscriptions.async_unsubscribe_all()
+        self._coalescer.cancel()
+        self._offline_command = None
+        self._cancel_rollback()
+        self._hub.cancel_request(self.request_topic)
+        if self._cancel_request is not None:
+            self._cancel_request()
+            self._cancel_request = None
+        self._store.async_untrack_channel(self._device_id, self._channel)
+
+    @callback
+    def device_availability_updated(self):
+        """Handle a change of the device availability reported by the hub."""
+        if self._offline_command is not None and self._hub.available():
+            self._flush_offline_command()
+
+        if self._light_state_callback != None:
+            self._light_state_callback()
+
+        if self._board_temp_callback != None:
+            self._board_temp_callback()
+
+        if self._picture_callback != None:
+            self._picture_callback()
+
+        if self._effect_callback != None:
+            self._effect_callback()
+
+    @callback
+    def device_board_temperature_updated(self):
+        if self._board_temp_callback != None:
+            self._board_temp_callback()
+
+    @callback
+    def device_attributes_updated(self):
+        if self._attr_callback != None:
+            self._attr_callback()
+
+    @callback
+    def device_ota_updated(self):
+        if self._ota_callback != None:
+            self._ota_callback()
+
+    @callback
+    def _message_received(self, msg):
+        """Run when new MQTT message has been received."""
+
+        _LOGGER.debug("[%s] MQTT message received: %s", self._device_id, msg.payload)
+        data = parse_channel_state(msg.payload)
+        if data is None:
+            self._hub.count_malformed_message(msg.topic, msg.payload)
+            return
+
+        self._hub.async_message_seen()
+        self._hub.resolve_request(self.request_topic)
+        self._state_received = True
+        self._state_confirmed = True
+        self._measure_command_latency(data)
+
+        self._clear_in_flight(data)
+        # An echo matching the optimistic state changes nothing and writes nothing
+        self._cancel_rollback()
+
+        if self._update_state(data) or self._mirror_outdated:
+            self._async_mirror_state()
+
+    @callback
+    def _clear_in_flight(self, data):
+        """Drop the in-flight fields which a reported state reflects.
+
+        A stale echo of an older command leaves the newer values in flight, so
+        a later command going back to the echoed value is not skipped.
+        """
+        reported = {
+            PIXIE_ATTR_STATE: "ON" if data.state else "OFF",
+            PIXIE_ATTR_BRIGHTNESS: data.brightness,
+            PIXIE_ATTR_WHITE_VALUE: data.white_value,
+            PIXIE_ATTR_PARAMETER1: data.parameter1,
+            PIXIE_ATTR_PARAMETER2: data.parameter2,
+            PIXIE_ATTR_EFFECT: data.effect,
+            PIXIE_ATTR_PICTURE: data.picture,
+        }
+        for key, value in list(self._in_flight.items()):
+            if key == PIXIE_ATTR_COLOR:
+                reflected = data.rgb == (value["r"], value["g"], value["b"]) and value.get("w", data.white_value) == data.white_value
+            else:
+                # Transitions are actions, they are not part of the state
+                reflected = key not in reported or reported[key] == value
+            if reflected:
+                del self._in_flight[key]
+
+    @callback
+    def _measure_command_latency(self, data):
+        """Match a reported state against the commands sent before."""
+        if not self._sent_commands:
+            return
+
+        now = self.hass.loop.time()
+        for index in range(len(self._sent_commands) - 1, -1, -1):
+            sent, command = self._sent_commands[index]
+            if command.is_reflected_by(data):
+                self._hub.record_command_latency(now - sent)
+                # The older commands have been superseded by this one
+                for _ in range(index + 1):
+                    self._sent_commands.popleft()
+                return
 
-    async def publish_command(self, message, qos, retain):
-        _LOGGER.info("Publish a command %s to the topic %s", message, self.command_topic)
-        await mqtt.async_publish( self.hass, self.command_topic, message, qos, retain )
+    @callback
+    def _retained_message_received(self, msg):
+        """Use the retained state until the device answers itself."""
+        if self._state_received:
+            return
+
+        _LOGGER.debug("[%s] MQTT retained message received: %s", self._device_id, msg.payload)
+        data = parse_channel_state(msg.payload)
+        if data is None:
+            self._hub.count_malformed_message(msg.topic, msg.payload)
+            return
+
+        self._state_received = True
+        self._mirror_outdated = False
+        self._bootstrap.async_device_ready(self._device_id)
+        self._update_state(data)
+
+    @callback
+    def _async_mirror_state(self):
+        """Publish the full channel state as a retained message."""
+        if not self._retained_state:
+            return
+
+        self._mirror_outdated = False
+        payload = dumps({
+            PIXIE_ATTR_STATE: "ON" if self._state else "OFF",
+            PIXIE_ATTR_BRIGHTNESS: self._brightness,
+            PIXIE_ATTR_COLOR: {"r": self._rgb[0], "g": self._rgb[1], "b": self._rgb[2]},
+            PIXIE_ATTR_WHITE_VALUE: self._white_value,
+            PIXIE_ATTR_PARAMETER1: self._parameter1,
+            PIXIE_ATTR_PARAMETER2: self._parameter2,
+            PIXIE_ATTR_EFFECT: self._effect,
+            PIXIE_ATTR_PICTURE: self._picture,
+        })
+        self.hass.async_create_task(
+            mqtt.async_publish( self.hass, self.retained_topic, payload, self.qos, True )
+        )
+
+    @callback
+    def _update_state(self, data):
+        """Apply a parsed channel state, return True if it has changed."""
+        previous_effect = self._effect
+        previous_picture = self._picture
+        previous_values = self._light_values()
+
+        self._state = data.state
+        self._picture = data.picture
+        self._effect = data.effect
+
+        if data.rgb is not None:
+            self._rgb = data.rgb
+
+        if data.parameter1 is not None:
+            self._parameter1 = data.parameter1
+
+        if data.parameter2 is not None:
+            self._parameter2 = data.parameter2
+
+        if data.brightness is not None:
+            self._brightness = data.brightness
+
+        if data.white_value is not None:
+            self._white_value = data.white_value
+
+        # Duplicate echoes of the firmware must not write the entity states again
+        if self._light_values() == previous_values:
+            return False
+
+        self._store.async_schedule_save()
+        self._notify_state(previous_effect, previous_picture)
+        return True
+
+    @callback
+    def _notify_state(self, previous_effect, previous_picture):
+        """Write the states of the entities showing the channel."""
+        self._hub.channel_state_updated()
+
+        if self._effect_callback != None and self._effect != previous_effect:
+            self._effect_callback()
+
+        if self._picture_callback != None and self._picture != previous_picture:
+            self._picture_callback()
+
+        if self._light_state_callback != None:
+            self._light_state_callback()
+
+    @callback
+    def _apply_optimistic(self, command):
+        """Show the state a command will set before the device confirms it."""
+        if not self._optimistic:
+            return
+
+        previous_effect = self._effect
+        previous_picture = self._picture
+        previous_values = self._light_values()
+
+        fields = command.fields
+        self._state = command.state()
+        if PIXIE_ATTR_BRIGHTNESS in fields:
+            self._brightness = fields[PIXIE_ATTR_BRIGHTNESS]
+        if PIXIE_ATTR_COLOR in fields:
+            color = fields[PIXIE_ATTR_COLOR]
+            self._rgb = (color["r"], color["g"], color["b"])
+            self._white_value = color.get("w", self._white_value)
+        self._white_value = fields.get(PIXIE_ATTR_WHITE_VALUE, self._white_value)
+        self._parameter1 = fields.get(PIXIE_ATTR_PARAMETER1, self._parameter1)
+        self._parameter2 = fields.get(PIXIE_ATTR_PARAMETER2, self._parameter2)
+        if PIXIE_ATTR_EFFECT in fields:
+            self._effect = fields[PIXIE_ATTR_EFFECT]
+            self._picture = None
+        elif PIXIE_ATTR_PICTURE in fields:
+            self._picture = fields[PIXIE_ATTR_PICTURE]
+            self._effect = None
+
+        if self._light_values() == previous_values:
+            return
+
+        if self._confirmed_values is None:
+            self._confirmed_values = previous_values
+        self._cancel_rollback_timer()
+        self._rollback_timer = self.hass.loop.call_later(self._optimistic_timeout, self._rollback)
+        self._notify_state(previous_effect, previous_picture)
+
+    @callback
+    def _rollback(self):
+        """Show the confirmed state again, the device has not echoed the command."""
+        self._rollback_timer = None
+        _LOGGER.warning(
+            "[%s] No state received from the channel %s within %s s, rolling back the optimistic state",
+            self._device_id, self._channel, self._optimistic_timeout,
+        )
+
+        previous_effect = self._effect
+        previous_picture = self._picture
+        self._set_light_values(self._confirmed_values)
+        self._confirmed_values = None
+        self._notify_state(previous_effect, previous_picture)
+
+    @callback
+    def _cancel_rollback(self):
+        """Drop the optimistic bookkeeping, the device has reported its state."""
+        self._confirmed_values = None
+        self._cancel_rollback_timer()
+
+    @callback
+    def _cancel_rollback_timer(self):
+        if self._rollback_timer is not None:
+            self._rollback_timer.cancel()
+            self._rollback_timer = None
+
+    def snapshot(self):
+        """Return the channel state to be persisted."""
+        return {
+            "state": self._state,
+            "brightness": self._brightness,
+            "rgb": list(self._rgb),
+            "white_value": self._white_value,
+            "parameter1": self._parameter1,
+            "parameter2": self._parameter2,
+            "effect": self._effect,
+            "picture": self._picture,
+        }
+
+    def restore(self, data):
+        """Restore the channel state from a snapshot."""
+        self._state = data.get("state", self._state)
+        self._brightness = data.get("brightness", self._brightness)
+        self._rgb = tuple(data.get("rgb", self._rgb))
+        self._white_value = data.get("white_value", self._white_value)
+        self._parameter1 = data.get("parameter1", self._parameter1)
+        self._parameter2 = data.get("parameter2", self._parameter2)
+        self._effect = data.get("effect", self._effect)
+        self._picture = data.get("picture", self._picture)
+
+    def _set_light_values(self, values):
+        (
+            self._state,
+            self._brightness,
+            self._rgb,
+            self._white_value,
+            self._parameter1,
+            self._parameter2,
+            self._effect,
+            self._picture,
+        ) = values
+
+    def _light_values(self):
+        """Return the channel values exposed by the entities."""
+        return (
+            self._state,
+            self._brightness,
+            self._rgb,
+            self._white_value,
+            self._parameter1,
+            self._parameter2,
+            self._effect,
+            self._picture,
+        )
+
+    async def publish_command(self, command, qos, retain):
+        """Publish a PixieCommand, commands of a slider drag are coalesced."""
+        self._apply_optimistic(command)
+        await self._coalescer.async_submit(command, qos, retain)
+
+    async def _async_send_command(self, command, qos, retain):
+        if not self._hub.available():
+            self._hold_offline_command(command, qos, retain)
+            return
+
+        # Only a state reported by the device tells which fields can be left out
+        if self._delta_commands and self._state_confirmed:
+            command = command.delta(self._confirmed_fields(command), self._in_flight)
+            if command is None:
+                _LOGGER.debug("[%s] Skipping a command which does not change the channel %s", self._device_id, self._channel)
+                return
+            self._in_flight.update(command.fields)
+
+        # Turning a channel on or off goes ahead of queued parameter updates
+        priority = PRIORITY_NORMAL
+        if command.state() != self.confirmed_state():
+            priority = PRIORITY_HIGH
+
+        payload = command.encode()
+        _LOGGER.info("Publish a command %s to the topic %s", payload, self.command_topic)
+        await self._hub.async_publish( self.command_topic, payload, qos, retain, priority, (self._channel,) )
+        self.command_published(command)
+
+    @callback
+    def _hold_offline_command(self, command, qos, retain):
+        """Keep the latest command until the device is online again."""
+        now = self.hass.loop.time()
+        if self._offline_command is None:
+            self._offline_command = (command.copy(), qos, retain, now)
+            self._offline_held += 1
+        else:
+            pending = self._offline_command[0]
+            self._offline_command = (pending.merge(command), qos, retain, now)
+            self._offline_superseded += 1
+        _LOGGER.debug("[%s] The device is offline, holding the command for the channel %s", self._device_id, self._channel)
+
+    @callback
+    def _flush_offline_command(self):
+        command, qos, retain, held = self._offline_command
+        self._offline_command = None
+
+        if self._offline_command_ttl > 0 and self.hass.loop.time() - held > self._offline_command_ttl:
+            self._offline_expired += 1
+            _LOGGER.info("[%s] Dropping the command %s held for the channel %s, it has expired", self._device_id, command, self._channel)
+            return
+
+        self._offline_flushed += 1
+        _LOGGER.info("[%s] The device is online, sending the held command %s to the channel %s", self._device_id, command, self._channel)
+        self.hass.async_create_task(self._async_send_command(command, qos, retain))
+
+    def coalesced_commands(self):
+        return self._coalescer.coalesced()
+
+    def offline_command_metrics(self):
+        return {
+            "pending": self._offline_command is not None,
+            "held": self._offline_held,
+            "superseded": self._offline_superseded,
+            "expired": self._offline_expired,
+            "flushed": self._offline_flushed,
+        }
+
+    @callback
+    def command_published(self, command):
+        """Start measuring the time until the device reports the command."""
+        now = self.hass.loop.time()
+        while self._sent_commands and now - self._sent_commands[0][0] > COMMAND_LATENCY_TIMEOUT:
+            self._sent_commands.popleft()
+        self._sent_commands.append((now, command))
+
+    @callback
+    def command_sent(self, command):
+        """Track a command which the hub has sent to several channels at once."""
+        self._apply_optimistic(command)
+        if self._delta_commands:
+            self._in_flight.update(command.fields)
+
+    def _confirmed_fields(self, command):
+        """Return the channel state confirmed by the device as command fields."""
+        state, brightness, rgb, white_value, parameter1, parameter2, effect, picture = self._confirmed()
+        confirmed = {
+            PIXIE_ATTR_STATE: "ON" if state else "OFF",
+            PIXIE_ATTR_BRIGHTNESS: brightness,
+            PIXIE_ATTR_PARAMETER1: parameter1,
+            PIXIE_ATTR_PARAMETER2: parameter2,
+            PIXIE_ATTR_WHITE_VALUE: white_value,
+            PIXIE_ATTR_EFFECT: effect,
+            PIXIE_ATTR_PICTURE: picture,
+            PIXIE_ATTR_COLOR: {"r": rgb[0], "g": rgb[1], "b": rgb[2]},
+        }
+        if "w" in command.fields.get(PIXIE_ATTR_COLOR, ()):
+            confirmed[PIXIE_ATTR_COLOR]["w"] = white_value
+        return confirmed
+
+    def _confirmed(self):
+        """Return the channel values last confirmed by the device."""
+        if self._confirmed_values is not None:
+            return self._confirmed_values
+        return self._light_values()
+
+    def confirmed_state(self):
+        """Return the on/off state last confirmed by the device."""
+        return self._confirmed()[0]
 
     async def ota_check(self):
-        _LOGGER.info("Check OTA availability: publish a request to the topic %s", self.ota_check_topic)
-        await mqtt.async_publish( self.hass, self.ota_check_topic, "1", 0, False )
-    
+        await self._hub.ota_check()
+
     async def ota_perform(self):
-        _LOGGER.info("Perform OTA update: publish a request to the topic %s", self.ota_perform_topic)
-        await mqtt.async_publish( self.hass, self.ota_perform_topic, "1", 0, False )
+        await self._hub.ota_perform()
+
+    def hub(self):
+        return self._hub
 
     def device_id(self):
         return self._device_id
@@ -327,7 +636,7 @@ class PixieCoordinator:
         return self._channel
 
     def available(self):
-        return self._available
+        return self._hub.available()
 
     def picture(self):
         return self._picture
@@ -336,10 +645,13 @@ class PixieCoordinator:
         return self._effect
 
     def board_temperature(self):
-        return self._board_temperature
+        return self._hub.board_temperature()
+
+    def board_temperature_statistics(self):
+        return self._hub.board_temperature_statistics()
 
     def uptime(self):
-        return self._uptime
+        return self._hub.uptime()
 
     def state(self):
         return self._state
@@ -363,25 +675,25 @@ class PixieCoordinator:
         return self._rgb
 
     def firmware_version(self):
-        return self._firmware_version
+        return self._hub.firmware_version()
 
     def ip_addr(self):
-        return self._ip_addr
+        return self._hub.ip_addr()
 
     def mac(self):
-        return self._mac
+        return self._hub.mac()
 
     def url(self):
-        return self._url
+        return self._hub.url()
 
     def available_version(self):
-        return self._available_version
+        return self._hub.available_version()
 
     def available_version_int(self):
-        return self._available_version_int
+        return self._hub.available_version_int()
 
     def firmware_version_int(self):
-        return self._firmware_version_int
+        return self._hub.firmware_version_int()
 
     def ota_in_progress(self):
-        return self._ota_in_progress
+        return self._hub.ota_in_progress()
@@ -0,0 +1,45 @@
+"""Diagnostics support for Pixie."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_BOOTSTRAP, DATA_WATCHDOG
+
+TO_REDACT = {"ip_addr", "mac", "url"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return the diagnostics of a channel and of its device."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    hub = coordinator.hub()
+    bootstrap = hass.data[DATA_BOOTSTRAP]
+    watchdog = hass.data.get(DATA_WATCHDOG)
+
+    return async_redact_data(
+        {
+            "entry": entry.as_dict(),
+            "bootstrap": {
+                "waiting_devices": bootstrap.waiting_devices(),
+                "ready_devices": bootstrap.ready_devices(),
+                "gave_up_devices": bootstrap.gave_up_devices(),
+                "warmup_duration": bootstrap.warmup_duration(),
+            },
+            "watchdog": {
+                "stale_devices": watchdog.stale_devices(),
+            } if watchdog is not None else None,
+            "channel": {
+                **coordinator.snapshot(),
+                "coalesced_commands": coordinator.coalesced_commands(),
+                "offline_commands": coordinator.offline_command_metrics(),
+            },
+            "device": {
+                **hub.snapshot(),
+                "channels": [channel.channel() for channel in hub.coordinators()],
+                "malformed_messages": hub.malformed_messages(),
+                "command_latency": hub.command_latency(),
+                "requests": hub.request_metrics(),
+                "rate_limiter": hub.rate_limiter_metrics(),
+            },
+        },
+        TO_REDACT,
+    )
@@ -0,0 +1,185 @@
+"""Command encoder for Pixie channels."""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .const import (
+    PIXIE_ATTR_STATE,
+    PIXIE_ATTR_TRANSITION_NAME,
+    PIXIE_ATTR_TRANSITION,
+    PIXIE_ATTR_PICTURE,
+    PIXIE_ATTR_EFFECT,
+    PIXIE_ATTR_PARAMETER1,
+    PIXIE_ATTR_PARAMETER2,
+    PIXIE_ATTR_BRIGHTNESS,
+    PIXIE_ATTR_WHITE_VALUE,
+    PIXIE_ATTR_COLOR,
+    PIXIE_ATTR_RGB_COLOR,
+    PIXIE_ATTR_RGBW_COLOR,
+)
+
+if orjson is not None:
+    def dumps(obj):
+        """Serialize to compact JSON."""
+        return orjson.dumps(obj).decode()
+else:
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+# A command runs either an effect, a picture or a transition, so setting one
+# of them drops the others when commands are merged
+MODE_KEYS = {
+    PIXIE_ATTR_EFFECT: (PIXIE_ATTR_PICTURE, PIXIE_ATTR_TRANSITION_NAME, PIXIE_ATTR_TRANSITION),
+    PIXIE_ATTR_PICTURE: (PIXIE_ATTR_EFFECT, PIXIE_ATTR_TRANSITION_NAME, PIXIE_ATTR_TRANSITION),
+    PIXIE_ATTR_TRANSITION_NAME: (PIXIE_ATTR_EFFECT, PIXIE_ATTR_PICTURE),
+    PIXIE_ATTR_TRANSITION: (PIXIE_ATTR_EFFECT, PIXIE_ATTR_PICTURE),
+}
+
+_BYTE_FIELDS = (PIXIE_ATTR_PARAMETER1, PIXIE_ATTR_PARAMETER2, PIXIE_ATTR_WHITE_VALUE)
+
+
+def _clamp(value, low, high):
+    value = int(value)
+    if value < low:
+        return low
+    if value > high:
+        return high
+    return value
+
+
+def _name(value):
+    return value.strip('"').strip("'")
+
+
+class PixieCommand:
+    """A validated command for a Pixie channel.
+
+    The values are validated and clamped once when the command is built,
+    the JSON payload is serialized once and cached.
+    """
+
+    __slots__ = ("fields", "_payload")
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._payload = None
+
+    @classmethod
+    def build(cls, state, **kwargs):
+        """Build a command from the arguments of a light or a service call.
+
+        Only one of effect, picture and transition is used, in this order.
+        """
+        fields = {PIXIE_ATTR_STATE: "ON" if state else "OFF"}
+
+        brightness = kwargs.get(PIXIE_ATTR_BRIGHTNESS)
+        if brightness is not None:
+            # Make sure the brightness is not rounded down to 0
+            fields[PIXIE_ATTR_BRIGHTNESS] = _clamp(brightness, 1, 255)
+
+        for key in _BYTE_FIELDS:
+            value = kwargs.get(key)
+            if value is not None:
+                fields[key] = _clamp(value, 0, 255)
+
+        if kwargs.get(PIXIE_ATTR_EFFECT) is not None:
+            fields[PIXIE_ATTR_EFFECT] = _name(kwargs[PIXIE_ATTR_EFFECT])
+        elif kwargs.get(PIXIE_ATTR_PICTURE) is not None:
+            fields[PIXIE_ATTR_PICTURE] = _name(kwargs[PIXIE_ATTR_PICTURE])
+        elif kwargs.get(PIXIE_ATTR_TRANSITION) is not None:
+            fields[PIXIE_ATTR_TRANSITION] = kwargs[PIXIE_ATTR_TRANSITION]
+            if kwargs.get(PIXIE_ATTR_TRANSITION_NAME) is not None:
+                fields[PIXIE_ATTR_TRANSITION_NAME] = _name(kwargs[PIXIE_ATTR_TRANSITION_NAME])
+
+        rgb = kwargs.get(PIXIE_ATTR_RGB_COLOR)
+        rgbw = kwargs.get(PIXIE_ATTR_RGBW_COLOR)
+        if rgb is not None:
+            fields[PIXIE_ATTR_COLOR] = {"r": _clamp(rgb[0], 0, 255), "g": _clamp(rgb[1], 0, 255), "b": _clamp(rgb[2], 0, 255)}
+        elif rgbw is not None:
+            fields[PIXIE_ATTR_COLOR] = {
+                "r": _clamp(rgbw[0], 0, 255),
+                "g": _clamp(rgbw[1], 0, 255),
+                "b": _clamp(rgbw[2], 0, 255),
+                "w": _clamp(rgbw[3], 0, 255),
+            }
+
+        return cls(fields)
+
+    def state(self):
+        return self.fields[PIXIE_ATTR_STATE] == "ON"
+
+    def merge(self, newer):
+        """Merge a newer command into this one, the newer values win."""
+        fields = self.fields
+        if not newer.state():
+            # Turning a channel off makes the pending parameters meaningless
+            fields.clear()
+
+        for key, others in MODE_KEYS.items():
+            if key in newer.fields:
+                for other in others:
+                    fields.pop(other, None)
+
+        fields.update(newer.fields)
+        self._payload = None
+        return self
+
+    def copy(self):
+        return PixieCommand(dict(self.fields))
+
+    def delta(self, confirmed, in_flight):
+        """Return a command with the fields which differ from the confirmed state.
+
+        A field is only left out if its confirmed value equals the new one and
+        no command with another value is still in flight. Transitions are
+        actions rather than states, so they are always sent in full. Return
+        None if the command would not change anything.
+        """
+        fields = self.fields
+        if PIXIE_ATTR_TRANSITION in fields or PIXIE_ATTR_TRANSITION_NAME in fields:
+            return self
+
+        delta = {}
+        for key, value in fields.items():
+            if key in confirmed and confirmed[key] == value and in_flight.get(key, value) == value:
+                continue
+            delta[key] = value
+
+        if not delta:
+            return None
+
+        # The firmware expects the state in every command
+        delta[PIXIE_ATTR_STATE] = fields[PIXIE_ATTR_STATE]
+        return PixieCommand(delta)
+
+    def is_reflected_by(self, state):
+        """Return True if a parsed channel state shows the result of the command."""
+        fields = self.fields
+        if state.state != self.state():
+            return False
+
+        for key, value in (
+            (PIXIE_ATTR_BRIGHTNESS, state.brightness),
+            (PIXIE_ATTR_PARAMETER1, state.parameter1),
+            (PIXIE_ATTR_PARAMETER2, state.parameter2),
+            (PIXIE_ATTR_EFFECT, state.effect),
+            (PIXIE_ATTR_PICTURE, state.picture),
+        ):
+            if key in fields and fields[key] != value:
+                return False
+
+        color = fields.get(PIXIE_ATTR_COLOR)
+        if color is not None and state.rgb != (color["r"], color["g"], color["b"]):
+            return False
+        return True
+
+    def encode(self):
+        """Return the compact JSON payload of the command."""
+        if self._payload is None:
+            self._payload = dumps(self.fields)
+        return self._payload
+
+    def __repr__(self):
+        return f"PixieCommand({self.encode()})"
@@ -0,0 +1,62 @@
+"""Fixed-memory latency histogram."""
+import bisect
+
+# Upper bounds of the buckets in seconds, 20 % apart from 5 ms to about a minute
+BUCKET_BOUNDS = tuple(0.005 * 1.2 ** index for index in range(52))
+
+
+class PixieLatencyHistogram:
+    """Count latencies in logarithmic buckets.
+
+    The memory does not grow with the number of samples. Percentiles are
+    reported as the upper bound of their bucket, so they are accurate to
+    20 %. Minimum, maximum and mean are exact.
+    """
+
+    def __init__(self):
+        # The last bucket counts the samples above the highest bound
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._count = 0
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    def add(self, seconds):
+        self._counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self._count += 1
+        self._total += seconds
+        self._min = seconds if self._min is None else min(self._min, seconds)
+        self._max = seconds if self._max is None else max(self._max, seconds)
+
+    def count(self):
+        return self._count
+
+    def percentile(self, percent):
+        """Return the latency below which percent of the samples are, None without samples."""
+        if not self._count:
+            return None
+
+        rank = percent / 100 * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if count and seen >= rank:
+                if index == len(BUCKET_BOUNDS):
+                    return self._max
+                return min(BUCKET_BOUNDS[index], self._max)
+        return self._max
+
+    def summary(self):
+        """Return the count and the percentiles in milliseconds."""
+        def milliseconds(seconds):
+            return None if seconds is None else round(seconds * 1000)
+
+        return {
+            "count": self._count,
+            "p50": milliseconds(self.percentile(50)),
+            "p95": milliseconds(self.percentile(95)),
+            "p99": milliseconds(self.percentile(99)),
+            "min": milliseconds(self._min),
+            "max": milliseconds(self._max),
+            "mean": milliseconds(self._total / self._count) if self._count else None,
+        }
@@ -0,0 +1,688 @@
+"""Device-wide MQTT topics shared by all channels of a Pixie device."""
+import asyncio
+import logging
+from datetime import timedelta
+
+from homeassistant.const import (
+    ATTR_IDENTIFIERS,
+    ATTR_MANUFACTURER,
+    ATTR_MODEL,
+    ATTR_NAME,
+    ATTR_SW_VERSION,
+)
+from homeassistant.core import callback
+from homeassistant.components import mqtt
+from homeassistant.util import dt as dt_util
+
+from .aggregate import PixieWindowAggregate
+from .encoder import dumps
+from .histogram import PixieLatencyHistogram
+from .parser import parse_attributes, parse_ota_reply
+from .ratelimit import PixieRateLimiter, PRIORITY_HIGH, PRIORITY_NORMAL
+from .subscription import PixieSubscriptionRegistry
+from .tracker import PixieRequestTracker
+from .const import (
+    DOMAIN,
+    CONF_RATE_LIMIT,
+    CONF_RATE_LIMIT_BURST,
+    CONF_RETAINED_STATE,
+    CONF_COMBINED_COMMANDS,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TEMPERATURE_INTERVAL,
+    CONF_TEMPERATURE_STATISTICS_WINDOW,
+    DATA_CONFIG,
+    DATA_STORE,
+    DATA_BOOTSTRAP,
+    DATA_WATCHDOG,
+    RETAINED_STATE_WAIT,
+    BOOT_TIME_TOLERANCE,
+    PIXIE_ATTR_FIRMWARE_VERSION,
+    PIXIE_ATTR_IP_ADDR,
+    PIXIE_ATTR_MAC,
+    PIXIE_ATTR_URL,
+    PIXIE_CHANNELS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_get_hub(hass, device_id):
+    """Return the hub of a device and create it if it does not exist yet."""
+    hub_key = f"hub_{device_id}"
+    hub = hass.data[DOMAIN].get(hub_key)
+    if hub is None:
+        hub = PixieDeviceHub(hass, device_id)
+        hass.data[DOMAIN][hub_key] = hub
+    return hub
+
+
+@callback
+def async_release_hub(hass, hub):
+    """Drop the hub of a device once none of its channels are loaded."""
+    if hub.coordinators():
+        return
+    hub.async_shutdown()
+    hass.data[DOMAIN].pop(f"hub_{hub.device_id()}", None)
+
+
+class PixieDeviceHub:
+    """Class to manage the device-level topics of a single Pixie device.
+
+    The availability, attributes and OTA topics belong to the device rather
+    than to a channel. The hub subscribes to them once, parses every message
+    once and fans the result out to the coordinators of all channels.
+    """
+    def __init__(self, hass, device_id):
+        self.hass = hass
+
+        self._device_id = device_id
+        self._available = False
+        self._board_temperature = None
+        self._uptime = None
+        self._boot_time = None
+        self._firmware_version = None
+        self._ip_addr = None
+        self._mac = None
+        self._url = None
+
+        self._available_version = None
+        self._available_version_int = 0
+        self._firmware_version_int = 0
+        self._ota_in_progress = False
+        self._malformed_messages = 0
+        # Only a status message received in this run counts, not the restored state
+        self._reported_offline = False
+
+        self.qos = 0
+        self.availability_topic = f"pixie_{self._device_id}/status"
+        self.attribute_request_topic = f"pixie_{self._device_id}/attributes/get"
+        self.attribute_topic = f"pixie_{self._device_id}/attributes"
+        self.ota_check_topic = f"pixie_{self._device_id}/ota/check"
+        self.ota_perform_topic = f"pixie_{self._device_id}/ota/perform"
+        self.ota_reply_topic = f"pixie_{self._device_id}/ota"
+        self.all_channels_topic = f"pixie_{self._device_id}/channel"
+        # Retained copy of the attributes kept by the integration
+        self.retained_attribute_topic = f"pixie_{self._device_id}/attributes/retained"
+
+        self._coordinators = []
+        self._device_entity_adders = {}
+        self._group_light_callback = None
+        self._latency_callback = None
+        self._uptime_callback = None
+        self._command_latency = PixieLatencyHistogram()
+        self._subscriptions = PixieSubscriptionRegistry(hass, self.qos)
+
+        config = hass.data[DATA_CONFIG]
+        self._rate_limiter = PixieRateLimiter(
+            hass.loop, config[CONF_RATE_LIMIT], config[CONF_RATE_LIMIT_BURST]
+        )
+        self._retained_state = config[CONF_RETAINED_STATE]
+        self._combined_commands = config[CONF_COMBINED_COMMANDS]
+
+        # The board temperature shown by the sensors only follows larger changes
+        self._temperature_deadband = config[CONF_TEMPERATURE_DEADBAND]
+        self._temperature_interval = config[CONF_TEMPERATURE_INTERVAL]
+        self._latest_board_temperature = None
+        self._temperature_written = None
+        self._temperature_timer = None
+        self._temperature_statistics = None
+        if config[CONF_TEMPERATURE_STATISTICS_WINDOW] > 0:
+            self._temperature_statistics = PixieWindowAggregate(config[CONF_TEMPERATURE_STATISTICS_WINDOW])
+        self._attributes_received = False
+        # Until a retained copy of the attributes is known to exist
+        self._mirror_outdated = True
+
+        self._bootstrap = hass.data[DATA_BOOTSTRAP]
+        self._cancel_request = None
+        self._requests = PixieRequestTracker(hass.loop, self._device_id, self.reported_offline, self._request_gave_up)
+
+        self._watchdog = hass.data.get(DATA_WATCHDOG)
+        if self._watchdog is not None:
+            self._watchdog.add(self._device_id, self._probe, self._stale)
+
+        self._store = hass.data[DATA_STORE]
+        restored = self._store.device(self._device_id)
+        if restored is not None:
+            self.restore(restored)
+        self._store.async_track_device(self._device_id, self.snapshot)
+
+        _LOGGER.info("Set up a hub for the device %s;", self._device_id)
+
+    def add_coordinator(self, coordinator):
+        self._coordinators.append(coordinator)
+        self.channel_state_updated()
+
+    def remove_coordinator(self, coordinator):
+        if coordinator in self._coordinators:
+            self._coordinators.remove(coordinator)
+            self.channel_state_updated()
+
+        for adders in self._device_entity_adders.values():
+            owned = adders and adders[0][0] is coordinator
+            adders[:] = [adder for adder in adders if adder[0] is not coordinator]
+            if owned and adders:
+                # The entities went away with the entry of the channel, re-add them through another one
+                adders[0][1]()
+
+    def coordinators(self):
+        return self._coordinators
+
+    @callback
+    def async_add_device_entities(self, coordinator, platform, add_entities):
+        """Add the device-level entities of a platform through one of the channels.
+
+        The entities belong to the config entry of the first channel which
+        calls this. When that entry is unloaded the entities are added again
+        through the next channel.
+        """
+        adders = self._device_entity_adders.setdefault(platform, [])
+        adders.append((coordinator, add_entities))
+        if len(adders) == 1:
+            add_entities()
+
+    def group_light_callback(self, callback=None):
+        self._group_light_callback = callback
+
+    def uptime_sensor_callback(self, callback=None):
+        self._uptime_callback = callback
+
+    def latency_sensor_callback(self, callback=None):
+        self._latency_callback = callback
+
+    @callback
+    def record_command_latency(self, seconds):
+        """Record the time a channel took to report the state set by a command."""
+        self._command_latency.add(seconds)
+        if self._latency_callback != None:
+            self._latency_callback()
+
+    @callback
+    def channel_state_updated(self):
+        """Handle a change of the state of one of the channels."""
+        if self._group_light_callback != None:
+            self._group_light_callback()
+
+    async def async_mqtt_handler(self):
+        """Subscribe to the device topics on behalf of a channel entity."""
+        new_subscriptions = set()
+        for topic, handler in self._topic_handlers():
+            if await self._subscriptions.async_subscribe(topic, handler):
+                new_subscriptions.add(topic)
+
+        if self.attribute_topic in new_subscriptions:
+            self._cancel_request = self._bootstrap.async_schedule(self._device_id, self._async_request_attributes)
+
+    async def _async_request_attributes(self):
+        self._cancel_request = None
+        if self._retained_state and not self._attributes_received:
+            # The retained attributes arrive right after the subscription
+            await asyncio.sleep(RETAINED_STATE_WAIT)
+        if self._attributes_received:
+            _LOGGER.debug("[%s] The attributes are known, skipping the request", self._device_id)
+            return
+        await self.async_request(self.attribute_request_topic, self._async_publish_attribute_request)
+
+    async def _async_publish_attribute_request(self):
+        _LOGGER.info("Request the attributes over the topic %s", self.attribute_request_topic)
+        await mqtt.async_publish( self.hass, self.attribute_request_topic, "1", self.qos, False )
+
+    async def async_request(self, request_topic, publish):
+        """Send a /get request with publish() until the device answers."""
+        await self._requests.async_request(request_topic, publish)
+
+    @callback
+    def _request_gave_up(self):
+        self._bootstrap.async_device_gave_up(self._device_id)
+
+    @callback
+    def resolve_request(self, request_topic):
+        """Handle the reply to the request sent to request_topic."""
+        self._requests.resolve(request_topic)
+
+    @callback
+    def cancel_request(self, request_topic):
+        self._requests.cancel(request_topic)
+
+    @callback
+    def async_mqtt_release(self):
+        """Release the device topics used by a channel entity."""
+        for topic, _ in self._topic_handlers():
+            self._subscriptions.async_release(topic)
+
+    @callback
+    def async_shutdown(self):
+        """Unsubscribe from all device topics and drop the queued commands."""
+        self._subscriptions.async_unsubscribe_all()
+        self._rate_limiter.cancel()
+        self._requests.cancel()
+        if self._temperature_timer is not None:
+            self._temperature_timer.cancel()
+            self._temperature_timer = None
+        if self._watchdog is not None:
+            self._watchdog.remove(self._device_id)
+        if self._cancel_request is not None:
+            self._cancel_request()
+            self._cancel_request = None
+        self._store.async_untrack_device(self._device_id)
+
+    def _topic_handlers(self):
+        handlers = (
+            (self.availability_topic, self._availability_received),
+            (self.attribute_topic, self._attribute_message_received),
+            (self.ota_reply_topic, self._ota_message_received),
+        )
+        if self._retained_state:
+            handlers += ((self.retained_attribute_topic, self._retained_attribute_received),)
+        return handlers
+
+    @callback
+    def _availability_received(self, msg):
+        _LOGGER.debug("[%s] MQTT availability message received: %s", self._device_id, msg.payload)
+        available = msg.payload == "online"
+        if available and self._watchdog is not None:
+            self._watchdog.touch(self._device_id)
+
+        reconnected = available and self._reported_offline
+        self._reported_offline = not available
+        if not available:
+            # An offline device does not answer, the warm-up must not wait for it
+            self._bootstrap.async_device_gave_up(self._device_id)
+        if reconnected:
+            # The requests given up while the device was offline are sent again
+            self.hass.async_create_task(
+                self.async_request(self.attribute_request_topic, self._async_publish_attribute_request)
+            )
+            for coordinator in self._coordinators:
+                coordinator.async_request_state()
+
+        self._set_available(available)
+
+    @callback
+    def _set_available(self, available):
+        if available == self._available:
+            return
+        self._available = available
+
+        for coordinator in self._coordinators:
+            coordinator.device_availability_updated()
+
+        if self._group_light_callback != None:
+            self._group_light_callback()
+
+        if self._uptime_callback != None:
+            self._uptime_callback()
+
+        if self._latency_callback != None:
+            self._latency_callback()
+
+    @callback
+    def _probe(self):
+        """Ask a silent device for its attributes before it is marked stale."""
+        _LOGGER.debug("[%s] No message received for a while, probing the device", self._device_id)
+        self.hass.async_create_task(self._async_publish_attribute_request())
+
+    @callback
+    def _stale(self):
+        _LOGGER.warning("[%s] No message received within the availability timeout, the device is unavailable", self._device_id)
+        self._set_available(False)
+
+    @callback
+    def _attribute_message_received(self, msg):
+        _LOGGER.debug("[%s] MQTT attribute message received: %s", self._device_id, msg.payload)
+        data = parse_attributes(msg.payload)
+        if data is None:
+            self.count_malformed_message(msg.topic, msg.payload)
+            return
+
+        self.async_message_seen()
+        self.resolve_request(self.attribute_request_topic)
+        self._attributes_received = True
+
+        if self._update_attributes(data) or self._mirror_outdated:
+            self._async_mirror_attributes()
+
+    @callback
+    def _retained_attribute_received(self, msg):
+        """Use the retained attributes until the device answers itself."""
+        if self._attributes_received:
+            return
+
+        _LOGGER.debug("[%s] MQTT retained attribute message received: %s", self._device_id, msg.payload)
+        data = parse_attributes(msg.payload)
+        if data is None:
+            self.count_malformed_message(msg.topic, msg.payload)
+            return
+
+        self._attributes_received = True
+        self._mirror_outdated = False
+        self._bootstrap.async_device_ready(self._device_id)
+        self._update_attributes(data)
+
+    @callback
+    def _async_mirror_attributes(self):
+        """Publish the attributes which rarely change as a retained message."""
+        if not self._retained_state:
+            return
+
+        self._mirror_outdated = False
+        payload = dumps({
+            PIXIE_ATTR_FIRMWARE_VERSION: self._firmware_version,
+            PIXIE_ATTR_IP_ADDR: self._ip_addr,
+            PIXIE_ATTR_MAC: self._mac,
+            PIXIE_ATTR_URL: self._url,
+        })
+        self.hass.async_create_task(
+            mqtt.async_publish( self.hass, self.retained_attribute_topic, payload, self.qos, True )
+        )
+
+    @callback
+    def _update_attributes(self, data):
+        """Apply parsed attributes, return True if the persisted ones changed."""
+        board_temperature_updated = False
+        boot_time_updated = False
+        attributes_updated = False
+
+        if data.board_temperature is not None:
+            board_temperature_updated = self._update_board_temperature(data.board_temperature)
+            # The statistics of a closed window are written even if the temperature is stable
+            if self._temperature_statistics is not None and self._temperature_statistics.add(
+                self.hass.loop.time(), data.board_temperature
+            ):
+                board_temperature_updated = True
+
+        if data.uptime is not None and data.uptime != self._uptime:
+            self._uptime = data.uptime
+            boot_time_updated = self._update_boot_time(data.uptime)
+
+        if data.firmware_version is not None and data.firmware_version != self._firmware_version:
+            self._firmware_version = data.firmware_version
+            attributes_updated = True
+
+        if data.ip_addr is not None and data.ip_addr != self._ip_addr:
+            self._ip_addr = data.ip_addr
+            attributes_updated = True
+
+        if data.mac is not None and data.mac != self._mac:
+            self._mac = data.mac
+            attributes_updated = True
+
+        if data.url is not None and data.url != self._url:
+            self._url = data.url
+            attributes_updated = True
+
+        if not (board_temperature_updated or boot_time_updated or attributes_updated):
+            return False
+
+        if attributes_updated or boot_time_updated:
+            self._store.async_schedule_save()
+
+        if boot_time_updated and self._uptime_callback != None:
+            self._uptime_callback()
+
+        for coordinator in self._coordinators:
+            if board_temperature_updated:
+                coordinator.device_board_temperature_updated()
+            if attributes_updated:
+                coordinator.device_attributes_updated()
+
+        return attributes_updated
+
+    @callback
+    def _update_board_temperature(self, temperature):
+        """Return True if a reported temperature is to be shown.
+
+        Changes within the deadband are ignored. A change within the minimum
+        interval after the last shown value is shown when the interval ends.
+        """
+        self._latest_board_temperature = temperature
+        if not self._board_temperature_changed():
+            return False
+
+        now = self.hass.loop.time()
+        if self._temperature_written is not None:
+            wait = self._temperature_written + self._temperature_interval - now
+            if wait > 0:
+                if self._temperature_timer is None:
+                    self._temperature_timer = self.hass.loop.call_later(wait, self._write_board_temperature)
+                return False
+
+        self._board_temperature = temperature
+        self._temperature_written = now
+        return True
+
+    def _board_temperature_changed(self):
+        temperature = self._latest_board_temperature
+        if self._board_temperature is None:
+            return True
+        if temperature == self._board_temperature:
+            return False
+        return abs(temperature - self._board_temperature) >= self._temperature_deadband
+
+    @callback
+    def _write_board_temperature(self):
+        self._temperature_timer = None
+        if not self._board_temperature_changed():
+            return
+
+        self._board_temperature = self._latest_board_temperature
+        self._temperature_written = self.hass.loop.time()
+        for coordinator in self._coordinators:
+            coordinator.device_board_temperature_updated()
+
+    @callback
+    def _update_boot_time(self, uptime):
+        """Derive the boot time from the uptime, return True if the device has rebooted.
+
+        The boot time moves a little with every report because of the delivery
+        delay, so only a change above the tolerance counts as a reboot.
+        """
+        boot_time = dt_util.utcnow() - timedelta(seconds=uptime)
+        if self._boot_time is not None and abs((boot_time - self._boot_time).total_seconds()) < BOOT_TIME_TOLERANCE:
+            return False
+
+        self._boot_time = boot_time.replace(microsecond=0)
+        _LOGGER.debug("[%s] The device has booted at %s", self._device_id, self._boot_time)
+        return True
+
+    @callback
+    def _ota_message_received(self, msg):
+        _LOGGER.debug("[%s] MQTT OTA message received: %s", self._device_id, msg.payload)
+        data = parse_ota_reply(msg.payload)
+        if data is None:
+            self.count_malformed_message(msg.topic, msg.payload)
+            return
+
+        self.async_message_seen()
+
+        if data.ota_state == "start" and data.ota_type == "update" and data.result == 1:
+            self._ota_in_progress = True
+            _LOGGER.info("[%s] OTA update has started", self._device_id)
+        elif data.ota_state == "end" and data.ota_type == "update" and data.result == 1:
+            self._ota_in_progress = False
+            self._firmware_version = self._available_version
+            _LOGGER.info("[%s] OTA update has finished", self._device_id)
+        elif data.ota_state == "end" and data.ota_type == "update" and data.result != 1:
+            _LOGGER.warning("[%s] OTA update has failed", self._device_id)
+            self._ota_in_progress = False
+        elif data.ota_state == "end" and data.ota_type == "check" and data.result != 1:
+            _LOGGER.warning("[%s] OTA check update has failed", self._device_id)
+        elif data.ota_state == "end" and data.ota_type == "check" and data.result == 1:
+
+            if data.remote_version_int is not None:
+                self._available_version_int = data.remote_version_int
+                self._available_version = data.remote_version
+                _LOGGER.debug("[%s] Available firmware version: %s", self._device_id, self._available_version)
+
+            if data.running_version_int is not None:
+                self._firmware_version_int = data.running_version_int
+                self._firmware_version = data.running_version
+                _LOGGER.debug("[%s] Running firmware version: %s", self._device_id, self._firmware_version)
+
+        self._store.async_schedule_save()
+
+        for coordinator in self._coordinators:
+            coordinator.device_ota_updated()
+
+    @callback
+    def async_message_seen(self):
+        """Handle a message the device has published."""
+        self._bootstrap.async_device_ready(self._device_id)
+        if self._watchdog is not None and self._watchdog.touch(self._device_id) and not self._reported_offline:
+            _LOGGER.info("[%s] The device is sending messages again", self._device_id)
+            self._set_available(True)
+
+    @callback
+    def count_malformed_message(self, topic, payload):
+        """Count and drop a message which could not be parsed."""
+        self._malformed_messages += 1
+        _LOGGER.debug("[%s] Skipping malformatted message on the topic %s: %s", self._device_id, topic, payload)
+
+    def snapshot(self):
+        """Return the device state to be persisted."""
+        # The availability is not persisted, the device may have gone offline
+        # meanwhile. It is decided by the status topic or the watchdog.
+        return {
+            "firmware_version": self._firmware_version,
+            "firmware_version_int": self._firmware_version_int,
+            "ip_addr": self._ip_addr,
+            "mac": self._mac,
+            "url": self._url,
+            "boot_time": self._boot_time.isoformat() if self._boot_time is not None else None,
+        }
+
+    def restore(self, data):
+        """Restore the device state from a snapshot."""
+        self._firmware_version = data.get("firmware_version", self._firmware_version)
+        self._firmware_version_int = data.get("firmware_version_int", self._firmware_version_int)
+        self._ip_addr = data.get("ip_addr", self._ip_addr)
+        self._mac = data.get("mac", self._mac)
+        self._url = data.get("url", self._url)
+        if data.get("boot_time") is not None:
+            self._boot_time = dt_util.parse_datetime(data["boot_time"])
+
+    async def async_publish(self, topic, payload, qos, retain, priority=PRIORITY_NORMAL, channels=()):
+        """Publish a command to the device within the rate limit of the device.
+
+        channels are the channels changed by the command, it is sent after the
+        queued commands of these channels regardless of its priority.
+        """
+        await self._rate_limiter.async_acquire(priority, channels)
+        await mqtt.async_publish( self.hass, topic, payload, qos, retain )
+
+    async def async_publish_channels(self, command, channels, qos, retain):
+        """Publish a PixieCommand to several channels of the device.
+
+        With combined commands a command for all channels of the device is
+        one message over the all channels topic, so they change within the
+        same frame. Otherwise, and for a subset of the channels, the command
+        is published to every channel, the messages are queued back to back.
+        channels=None addresses all configured channels of the device.
+        """
+        coordinators = [
+            coordinator for coordinator in self._coordinators
+            if channels is None or coordinator.channel() in channels
+        ]
+        if not coordinators:
+            _LOGGER.warning("[%s] None of the channels %s are configured", self._device_id, channels)
+            return
+
+        # The all channels topic addresses every channel of the device, the
+        # channels hold the commands for an offline device one by one
+        all_channels = sorted(coordinator.channel() for coordinator in coordinators) == PIXIE_CHANNELS
+        if not self._combined_commands or not all_channels or not self._available:
+            await asyncio.gather(*(
+                coordinator.publish_command(command, qos, retain) for coordinator in coordinators
+            ))
+            return
+
+        priority = PRIORITY_NORMAL
+        for coordinator in coordinators:
+            if command.state() != coordinator.confirmed_state():
+                priority = PRIORITY_HIGH
+            coordinator.command_sent(command)
+
+        payload = command.encode()
+        _LOGGER.info("Publish a command %s to the topic %s", payload, self.all_channels_topic)
+        await self.async_publish( self.all_channels_topic, payload, qos, retain, priority, PIXIE_CHANNELS )
+        for coordinator in coordinators:
+            coordinator.command_published(command)
+
+    async def ota_check(self):
+        _LOGGER.info("Check OTA availability: publish a request to the topic %s", self.ota_check_topic)
+        await self.async_publish( self.ota_check_topic, "1", 0, False )
+
+    async def ota_perform(self):
+        _LOGGER.info("Perform OTA update: publish a request to the topic %s", self.ota_perform_topic)
+        await self.async_publish( self.ota_perform_topic, "1", 0, False )
+
+    def malformed_messages(self):
+        return self._malformed_messages
+
+    def rate_limiter_metrics(self):
+        return self._rate_limiter.metrics()
+
+    def request_metrics(self):
+        return self._requests.metrics()
+
+    def command_latency(self):
+        return self._command_latency.summary()
+
+    def reported_offline(self):
+        """Return True if the device has announced that it is offline."""
+        return self._reported_offline
+
+    def device_id(self):
+        return self._device_id
+
+    def available(self):
+        return self._available
+
+    def board_temperature(self):
+        return self._board_temperature
+
+    def board_temperature_statistics(self):
+        if self._temperature_statistics is None:
+            return None
+        return self._temperature_statistics.summary()
+
+    def uptime(self):
+        return self._uptime
+
+    def boot_time(self):
+        return self._boot_time
+
+    def firmware_version(self):
+        return self._firmware_version
+
+    def device_info(self):
+        """Return the device info shared by all entities of the device."""
+        return {
+            ATTR_IDENTIFIERS: {(DOMAIN, self._device_id)},
+            ATTR_NAME: "Pixie",
+            ATTR_MANUFACTURER: "iothus14",
+            ATTR_MODEL: "Pixie",
+            ATTR_SW_VERSION: self._firmware_version,
+            "configuration_url": f"http://pixie-{self._device_id}.local"
+        }
+
+    def ip_addr(self):
+        return self._ip_addr
+
+    def mac(self):
+        return self._mac
+
+    def url(self):
+        return self._url
+
+    def available_version(self):
+        return self._available_version
+
+    def available_version_int(self):
+        return self._available_version_int
+
+    def firmware_version_int(self):
+        return self._firmware_version_int
+
+    def ota_in_progress(self):
+        return self._ota_in_progress
@@ -1,7 +1,6 @@
 """Platform for light integration."""
 import logging
 
-import json
 import voluptuous as vol
 import random
 
@@ -11,16 +10,9 @@ from homeassistant.core import HomeAssistant, HomeAssistantError, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.config_entries import SOURCE_IMPORT
 from homeassistant.components import mqtt
-from homeassistant.const import (
-    ATTR_IDENTIFIERS,
-    ATTR_MANUFACTURER,
-    ATTR_MODEL,
-    ATTR_NAME,
-    ATTR_SW_VERSION,
-)
 from homeassistant.components.light import (
+    DOMAIN as LIGHT_DOMAIN,
     ATTR_RGB_COLOR,
-    ATTR_RGBW_COLOR,
     ATTR_BRIGHTNESS,
     ATTR_EFFECT,
     PLATFORM_SCHEMA,
@@ -34,10 +26,13 @@ from homeassistant.components.light import (
 )
 
 
+from .encoder import PixieCommand
 from .const import (
     DOMAIN,
     CONF_DEVICE_ID,
     CONF_CHANNEL,
+    CONF_GROUP_LIGHT,
+    DATA_CONFIG,
     PIXIE_ATTR_STATE,
     PIXIE_ATTR_TRANSITION_NAME,
     PIXIE_ATTR_TRANSITION,
@@ -164,10 +159,18 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     # Add devices
     async_add_entities([light], True)
 
+    if hass.data[DATA_CONFIG][CONF_GROUP_LIGHT]:
+        hub = coordinator.hub()
+        hub.async_add_device_entities(
+            coordinator, LIGHT_DOMAIN, lambda: async_add_entities([PixieGroupLight(hub)])
+        )
+
 
 class PixieLight(LightEntity):
     """Representation of a Pixie Light."""
     _attr_icon = "mdi:led-strip-variant"
+    # The address of the device rarely changes, there is no need to record it with every state
+    _unrecorded_attributes = frozenset({"url", "ip_addr"})
 
     def __init__(self, coordinator):
         """Initialize a PixieLight."""
@@ -180,200 +183,105 @@ class PixieLight(LightEntity):
         self.qos = 0
         self.retain = False
 
+        self._update_extra_state_attributes()
+        self._update_device_info()
+
+    def _update_extra_state_attributes(self):
+        """Build the attributes when the state changes rather than with every write."""
+        attributes = {
+            "url": self._coordinator.url(),
+            "ip_addr": self._coordinator.ip_addr(),
+        }
+
+        if self._coordinator.state():
+            attributes["parameter1"] = self._coordinator.parameter1()
+            attributes["parameter2"] = self._coordinator.parameter2()
+
+            if self._coordinator.picture():
+                attributes["picture"] = self._coordinator.picture()
+
+        self._attr_extra_state_attributes = attributes
+
+    def _update_device_info(self):
+        self._attr_device_info = self._coordinator.hub().device_info()
 
     def state_update_callback(self):
+        self._update_extra_state_attributes()
+        self.async_write_ha_state()
+
+    def attributes_update_callback(self):
+        self._update_extra_state_attributes()
+        self._update_device_info()
         self.async_write_ha_state()
 
     async def async_added_to_hass(self):
         """Subscribe to MQTT events."""
         self._coordinator.light_state_callback(self.state_update_callback)
-        self._coordinator.attr_callback(self.state_update_callback)
+        self._coordinator.attr_callback(self.attributes_update_callback)
         await self._coordinator.async_mqtt_handler()
 
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe from MQTT events."""
+        self._coordinator.light_state_callback(None)
+        self._coordinator.attr_callback(None)
+        self._coordinator.async_mqtt_release()
+
     async def async_turn_on(self, **kwargs):
         """Instruct the light to turn on."""
-
-        message = {"state": "ON"}
-
-        if "brightness" in kwargs:
-            device_brightness = min( kwargs["brightness"], 255 )
-            device_brightness = max(device_brightness, 1) # Make sure the brightness is not rounded down to 0
-            message["brightness"] = device_brightness
-
-        if "parameter1" in kwargs:
-            message["parameter1"] = min( kwargs["parameter1"], 255 )
-
-        if "parameter2" in kwargs:
-            message["parameter2"] = min( kwargs["parameter2"], 255 )
-
-        if "white_value" in kwargs:
-            message["white_value"] = min( kwargs["white_value"], 255 )
-
-        if "effect" in kwargs:
-            message["effect"] = kwargs[PIXIE_ATTR_EFFECT].strip('"').strip("'")
-        elif "picture" in kwargs:
-            message["picture"] = kwargs["picture"].strip('"').strip("'")
-        elif "transition" in kwargs:
-            message["transition"] = kwargs["transition"]
-            if "transition_name" in kwargs:
-                message["transition_name"] = kwargs["transition_name"].strip('"').strip("'")
-
-        if ATTR_RGB_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGB_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2]}
-
-        if ATTR_RGBW_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGBW_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2], "w": rgb[3]}
-
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
+        command = PixieCommand.build(True, **kwargs)
+        await self._async_publish_command(command)
 
     async def async_turn_off(self, **kwargs):
         """Instruct the light to turn off."""
-        message = {"state": "OFF"}
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
+        command = PixieCommand.build(False)
+        await self._async_publish_command(command)
 
     async def async_set_effect(self, **kwargs):
         """Set an effect of a Pixie light."""
-        message = {"state": "ON"}
-    
         if PIXIE_ATTR_EFFECT not in kwargs:
             _LOGGER.warning("[%s] An effect must be specified to run the service pixie.set_effect", self._device_id )
             return
 
-        message["effect"] = kwargs[PIXIE_ATTR_EFFECT].strip('"').strip("'")
+        command = PixieCommand.build(True, **kwargs)
 
-        if message["effect"] not in PIXIE_EFFECT_LIST:
-            _LOGGER.warning("[%s] The specified effect %s is not supported. The effect is ignored.", self._device_id,  message["effect"])
+        if command.fields[PIXIE_ATTR_EFFECT] not in PIXIE_EFFECT_LIST:
+            _LOGGER.warning("[%s] The specified effect %s is not supported. The effect is ignored.", self._device_id, command.fields[PIXIE_ATTR_EFFECT])
             return
 
-        if PIXIE_ATTR_PARAMETER1 in kwargs:
-            message["parameter1"] = min( kwargs[PIXIE_ATTR_PARAMETER1], 255 )
-
-        if PIXIE_ATTR_PARAMETER2 in kwargs:
-            message["parameter2"] = min( kwargs[PIXIE_ATTR_PARAMETER2], 255 )
-
-        if ATTR_RGBW_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGBW_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2], "w": rgb[3]}
-
-        if ATTR_RGB_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGB_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2]}
-
-        if PIXIE_ATTR_BRIGHTNESS in kwargs:
-            message["brightness"] = min( max(1, kwargs[PIXIE_ATTR_BRIGHTNESS]), 255 )
-
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
+        await self._async_publish_command(command)
 
     async def async_set_random_effect(self, **kwargs):
         """Set a random effect of a Pixie light."""
-        message = {"state": "ON"}
-    
-        i = min( (len(PIXIE_EFFECT_LIST) - 1), round( random.random() * len(PIXIE_EFFECT_LIST) ) )
-        message["effect"] = PIXIE_EFFECT_LIST[ i ]
-
-        if PIXIE_ATTR_PARAMETER1 in kwargs:
-            message["parameter1"] = min( kwargs[PIXIE_ATTR_PARAMETER1], 255 )
-        else:
-            message["parameter1"] = round( random.random() * 255 )
-
-        if PIXIE_ATTR_PARAMETER2 in kwargs:
-            message["parameter2"] = min( kwargs[PIXIE_ATTR_PARAMETER2], 255 )
-        else:
-            message["parameter2"] = round( random.random() * 255 )
-
-        if ATTR_RGBW_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGBW_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2], "w": rgb[3]}
-        else:
-            message["color"] = { "r":round( random.random() * 255 ), "g":round( random.random() * 255 ), "b":round( random.random() * 255 ), "w":round( random.random() * 255 ) }
+        kwargs[PIXIE_ATTR_EFFECT] = random.choice(PIXIE_EFFECT_LIST)
+        kwargs.setdefault(PIXIE_ATTR_PARAMETER1, round( random.random() * 255 ))
+        kwargs.setdefault(PIXIE_ATTR_PARAMETER2, round( random.random() * 255 ))
+        kwargs.setdefault(ATTR_RGB_COLOR, ( round( random.random() * 255 ), round( random.random() * 255 ), round( random.random() * 255 ) ))
 
-        if ATTR_RGB_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGB_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2]}
-        else:
-            message["color"] = { "r":round( random.random() * 255 ), "g":round( random.random() * 255 ), "b":round( random.random() * 255 ) }
-
-        if PIXIE_ATTR_BRIGHTNESS in kwargs:
-            message["brightness"] = min( max(1, kwargs[PIXIE_ATTR_BRIGHTNESS]), 255 )
-
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
+        command = PixieCommand.build(True, **kwargs)
+        await self._async_publish_command(command)
 
     async def async_set_picture(self, **kwargs):
         """Set a picture of a Pixie light."""
-        message = {"state": "ON"}
-
-        message["picture"] = kwargs[PIXIE_ATTR_PICTURE].strip('"').strip("'")
-
-        if PIXIE_ATTR_PARAMETER1 in kwargs:
-            message["parameter1"] = min( kwargs[PIXIE_ATTR_PARAMETER1], 255 )
-
-        if PIXIE_ATTR_PARAMETER2 in kwargs:
-            message["parameter2"] = min( kwargs[PIXIE_ATTR_PARAMETER2], 255 )
-
-        if ATTR_RGBW_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGBW_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2], "w": rgb[3]}
-
-        if ATTR_RGB_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGB_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2]}
-
-        if PIXIE_ATTR_BRIGHTNESS in kwargs:
-            message["brightness"] = min( max(1, kwargs[PIXIE_ATTR_BRIGHTNESS]), 255 )
-
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
+        command = PixieCommand.build(True, **kwargs)
+        await self._async_publish_command(command)
 
     async def async_turn_on_transition(self, **kwargs):
         """Turn a Pixie light on with a transition."""
-
-        message = {"state": "ON"}
-        message["transition_name"] = kwargs[PIXIE_ATTR_TRANSITION_NAME].strip('"').strip("'")
-
-        message["transition"] = kwargs[PIXIE_ATTR_TRANSITION]
-
-        if PIXIE_ATTR_PARAMETER1 in kwargs:
-            message["parameter1"] = min( kwargs[PIXIE_ATTR_PARAMETER1], 255 )
-
-        if PIXIE_ATTR_PARAMETER2 in kwargs:
-            message["parameter2"] = min( kwargs[PIXIE_ATTR_PARAMETER2], 255 )
-
-        if ATTR_RGBW_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGBW_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2], "w": rgb[3]}
-        
-        if ATTR_RGB_COLOR in kwargs:
-            rgb = kwargs[ATTR_RGB_COLOR]
-            message["color"] = {"r": rgb[0], "g": rgb[1], "b": rgb[2]}
-
-        if PIXIE_ATTR_BRIGHTNESS in kwargs:
-            message["brightness"] = min( max(1, kwargs[PIXIE_ATTR_BRIGHTNESS]), 255 )
-
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
-
+        command = PixieCommand.build(True, **kwargs)
+        await self._async_publish_command(command)
 
     async def async_turn_off_transition(self, **kwargs):
         """Turn a Pixie light off with a transition."""
-
-        message = {"state": "OFF"}
-        message["transition_name"] = kwargs[PIXIE_ATTR_TRANSITION_NAME].strip('"').strip("'")
-
-        message["transition"] = kwargs[PIXIE_ATTR_TRANSITION]
-
-        if PIXIE_ATTR_PARAMETER1 in kwargs:
-            message["parameter1"] = min( kwargs[PIXIE_ATTR_PARAMETER1], 255 )
-
-        if PIXIE_ATTR_PARAMETER2 in kwargs:
-            message["parameter2"] = min( kwargs[PIXIE_ATTR_PARAMETER2], 255 )
-
-        await self._coordinator.publish_command(json.dumps(message), self.qos, self.retain)
-
+        command = PixieCommand.build(False, **kwargs)
+        await self._async_publish_command(command)
 
     async def async_check_ota(self, **kwargs):
         """Check available OTA update for a Pixie device."""
         await self._coordinator.ota_check()
 
+    async def _async_publish_command(self, command):
+        await self._coordinator.publish_command(command, self.qos, self.retain)
+
 
     @property
     def brightness(self):
@@ -447,31 +355,106 @@ class PixieLight(LightEntity):
         """Return the availability of the light."""
         return self._coordinator.available()
 
-    @property
-    def extra_state_attributes(self):
-        """Return the device specific state attributes."""
-        attributes = {
-            "url": self._coordinator.url(),
-            "ip_addr": self._coordinator.ip_addr(),
+
+
+class PixieGroupLight(PixieLight):
+    """A light controlling all channels of a Pixie device together.
+
+    The commands are sent to all channels at once through the hub, the
+    state is combined from the states of the channels.
+    """
+
+    def __init__(self, hub):
+        """Initialize a PixieGroupLight."""
+        self._hub = hub
+        self._device_id = hub.device_id()
+        self._attr_unique_id = f"pixie_{self._device_id}_all"
+        self._attr_name = f"Pixie {self._device_id} all channels"
+
+        self.qos = 0
+        self.retain = False
+
+        self._update_extra_state_attributes()
+        self._update_device_info()
+
+    def _update_extra_state_attributes(self):
+        self._attr_extra_state_attributes = {
+            "channels": [coordinator.channel() for coordinator in self._hub.coordinators()],
         }
 
-        if self._coordinator.state():
-            attributes["parameter1"] = self._coordinator.parameter1()
-            attributes["parameter2"] = self._coordinator.parameter2()
+    def _update_device_info(self):
+        self._attr_device_info = self._hub.device_info()
+
+    async def async_added_to_hass(self):
+        self._hub.group_light_callback(self.state_update_callback)
+
+    async def async_will_remove_from_hass(self):
+        self._hub.group_light_callback(None)
 
-        if self._coordinator.state() and self._coordinator.picture() != "" and self._coordinator.picture() != None:
-            attributes["picture"] = self._coordinator.picture()
+    async def async_check_ota(self, **kwargs):
+        """Check available OTA update for a Pixie device."""
+        await self._hub.ota_check()
+
+    async def _async_publish_command(self, command):
+        await self._hub.async_publish_channels(command, None, self.qos, self.retain)
+
+    def _channels_on(self):
+        """Return the coordinators of the channels which are on, all if none is."""
+        coordinators = self._hub.coordinators()
+        return [coordinator for coordinator in coordinators if coordinator.state()] or coordinators
 
-        return attributes
+    def _common(self, value):
+        """Return a value if all channels which are on share it, None otherwise."""
+        values = {value(coordinator) for coordinator in self._channels_on()}
+        if len(values) == 1:
+            return values.pop()
+        return None
 
     @property
-    def device_info(self):
-        return {
-            ATTR_IDENTIFIERS: {(DOMAIN, self._device_id)},
-            ATTR_NAME: "Pixie",
-            ATTR_MANUFACTURER: "iothus14",
-            ATTR_MODEL: "Pixie",
-            ATTR_SW_VERSION: self._coordinator.firmware_version(),
-            "configuration_url": f"http://pixie-{self._coordinator.device_id()}.local"
-        }
+    def brightness(self):
+        """Return the highest brightness of the channels."""
+        return max((coordinator.brightness() for coordinator in self._channels_on()), default=None)
 
+    @property
+    def is_on(self):
+        """Return true if any channel is on."""
+        return any(coordinator.state() for coordinator in self._hub.coordinators())
+
+    @property
+    def rgb_color(self):
+        channels = self._channels_on()
+        return channels[0].rgb() if channels else None
+
+    @property
+    def parameter1(self):
+        return self._common(lambda coordinator: coordinator.parameter1())
+
+    @property
+    def parameter2(self):
+        return self._common(lambda coordinator: coordinator.parameter2())
+
+    @property
+    def white_value(self):
+        return self._common(lambda coordinator: coordinator.white_value())
+
+    @property
+    def effect(self):
+        """Return the effect if all channels run the same one."""
+        return self._common(lambda coordinator: coordinator.effect())
+
+    @property
+    def picture(self):
+        """Return the picture if all channels show the same one."""
+        return self._common(lambda coordinator: coordinator.picture())
+
+    @property
+    def supported_color_modes(self):
+        return { COLOR_MODE_RGB }
+
+    @property
+    def color_mode(self):
+        return COLOR_MODE_RGB
+
+    @property
+    def available(self):
+        return self._hub.available() and bool(self._hub.coordinators())
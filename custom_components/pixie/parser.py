@@ -0,0 +1,203 @@
+"""Parsers for the payloads published by Pixie devices."""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+try:
+    # The same decoder Home Assistant uses for its json_loads
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from .const import (
+    PIXIE_ATTR_STATE,
+    PIXIE_ATTR_PICTURE,
+    PIXIE_ATTR_EFFECT,
+    PIXIE_ATTR_PARAMETER1,
+    PIXIE_ATTR_PARAMETER2,
+    PIXIE_ATTR_BRIGHTNESS,
+    PIXIE_ATTR_WHITE_VALUE,
+    PIXIE_ATTR_COLOR,
+    PIXIE_ATTR_BOARD_TEMPERATURE,
+    PIXIE_ATTR_UPTIME,
+    PIXIE_ATTR_FIRMWARE_VERSION,
+    PIXIE_ATTR_MAC,
+    PIXIE_ATTR_IP_ADDR,
+    PIXIE_ATTR_URL,
+)
+
+# orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
+JSON_DECODE_EXCEPTIONS = (ValueError, TypeError)
+
+_STATES = {"ON": True, "OFF": False}
+_NUMBER_TYPES = (int, float)
+
+
+class PixieChannelState(NamedTuple):
+    """State of a channel, None for the values missing in the payload."""
+
+    state: bool
+    brightness: int | None
+    rgb: tuple | None
+    white_value: int | None
+    parameter1: int | None
+    parameter2: int | None
+    effect: str | None
+    picture: str | None
+
+
+class PixieAttributes(NamedTuple):
+    """Attributes of a device, None for the values missing in the payload."""
+
+    board_temperature: float | None
+    uptime: int | None
+    firmware_version: str | None
+    ip_addr: str | None
+    mac: str | None
+    url: str | None
+
+
+class PixieOtaReply(NamedTuple):
+    """Reply of a device to an OTA check or update."""
+
+    ota_state: str
+    ota_type: str
+    result: int
+    remote_version: str | None
+    remote_version_int: int | None
+    running_version: str | None
+    running_version_int: int | None
+
+
+def _decode(payload):
+    try:
+        data = json_loads(payload)
+    except JSON_DECODE_EXCEPTIONS:
+        return None
+    if type(data) is not dict:
+        return None
+    return data
+
+
+def _byte(data, key):
+    """Return a 0..255 value of the payload, None if it is missing.
+
+    Raise ValueError or TypeError if the value is invalid.
+    """
+    value = data.get(key)
+    if value is None:
+        return None
+    if type(value) is not int:
+        value = int(value)
+    if not 0 <= value <= 255:
+        raise ValueError(key)
+    return value
+
+
+def _string(data, key):
+    value = data.get(key)
+    if value is not None and type(value) is not str:
+        raise ValueError(key)
+    return value
+
+
+def parse_version(version):
+    """Return a firmware version x.y.z as an integer, None if it is malformed."""
+    if type(version) is not str:
+        return None
+    parts = version.split('.')
+    if len(parts) != 3:
+        return None
+    try:
+        return 100 * int(parts[0]) + 10 * int(parts[1]) + int(parts[2])
+    except ValueError:
+        return None
+
+
+def parse_channel_state(payload):
+    """Parse a message of a channel topic, return None if it is malformed."""
+    data = _decode(payload)
+    if data is None:
+        return None
+
+    state = data.get(PIXIE_ATTR_STATE)
+    if type(state) is not str:
+        return None
+    state = _STATES.get(state.upper())
+    if state is None:
+        return None
+
+    rgb = None
+    color = data.get(PIXIE_ATTR_COLOR)
+    try:
+        if color is not None:
+            if type(color) is not dict:
+                return None
+            rgb = (_byte(color, "r"), _byte(color, "g"), _byte(color, "b"))
+            if None in rgb:
+                return None
+
+        return PixieChannelState(
+            state,
+            _byte(data, PIXIE_ATTR_BRIGHTNESS),
+            rgb,
+            _byte(data, PIXIE_ATTR_WHITE_VALUE),
+            _byte(data, PIXIE_ATTR_PARAMETER1),
+            _byte(data, PIXIE_ATTR_PARAMETER2),
+            _string(data, PIXIE_ATTR_EFFECT),
+            _string(data, PIXIE_ATTR_PICTURE),
+        )
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_attributes(payload):
+    """Parse a message of the attributes topic, return None if it is malformed."""
+    data = _decode(payload)
+    if data is None:
+        return None
+
+    board_temperature = data.get(PIXIE_ATTR_BOARD_TEMPERATURE)
+    if board_temperature is not None and type(board_temperature) not in _NUMBER_TYPES:
+        return None
+
+    uptime = data.get(PIXIE_ATTR_UPTIME)
+    if uptime is not None and type(uptime) not in _NUMBER_TYPES:
+        return None
+
+    try:
+        return PixieAttributes(
+            board_temperature,
+            uptime,
+            _string(data, PIXIE_ATTR_FIRMWARE_VERSION),
+            _string(data, PIXIE_ATTR_IP_ADDR),
+            _string(data, PIXIE_ATTR_MAC),
+            _string(data, PIXIE_ATTR_URL),
+        )
+    except ValueError:
+        return None
+
+
+def parse_ota_reply(payload):
+    """Parse a message of the OTA topic, return None if it is malformed."""
+    data = _decode(payload)
+    if data is None:
+        return None
+
+    ota_state = data.get("ota_state")
+    ota_type = data.get("ota_type")
+    result = data.get("result")
+    if type(ota_state) is not str or type(ota_type) is not str or type(result) is not int:
+        return None
+
+    remote_version = data.get("remote_version")
+    running_version = data.get("running_version")
+    return PixieOtaReply(
+        ota_state,
+        ota_type,
+        result,
+        remote_version if type(remote_version) is str else None,
+        parse_version(remote_version),
+        running_version if type(running_version) is str else None,
+        parse_version(running_version),
+    )
@@ -0,0 +1,112 @@
+"""Token bucket limiting the rate of commands sent to a Pixie device."""
+import heapq
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+class PixieRateLimiter:
+    """Limit the commands of a device to a rate with a burst allowance.
+
+    Commands which cannot be sent right away wait in a priority queue, so
+    on/off commands are sent before queued cosmetic parameter updates of
+    other channels. A command never overtakes a queued command of one of
+    its channels, the newer command would be undone otherwise.
+    A rate of 0 disables the limiter.
+    """
+
+    def __init__(self, loop, rate, burst):
+        self._loop = loop
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = loop.time()
+        self._waiters = []
+        self._sequence = 0
+        self._timer = None
+
+        self._commands = 0
+        self._delayed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._max_queue_depth = 0
+
+    async def async_acquire(self, priority=PRIORITY_NORMAL, channels=()):
+        """Wait until a command for the given channels may be sent."""
+        self._commands += 1
+        if self._rate <= 0:
+            return
+
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        channels = frozenset(channels)
+        for waiting_priority, _, future, waiting_channels in self._waiters:
+            if not future.done() and channels & waiting_channels:
+                # Queue behind the waiting command of the same channel
+                priority = max(priority, waiting_priority)
+
+        future = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, self._sequence, future, channels))
+        self._sequence += 1
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        self._schedule()
+
+        started = self._loop.time()
+        await future
+
+        wait = self._loop.time() - started
+        self._delayed += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def _refill(self):
+        now = self._loop.time()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def _schedule(self):
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self._rate)
+        self._timer = self._loop.call_later(delay, self._release)
+
+    def _release(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if future.done():
+                # The waiting command has been cancelled
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        self._schedule()
+
+    def cancel(self):
+        """Stop the limiter and cancel all waiting commands."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, _, future, _ in self._waiters:
+            future.cancel()
+        self._waiters = []
+
+    def queue_depth(self):
+        return sum(1 for _, _, future, _ in self._waiters if not future.done())
+
+    def metrics(self):
+        """Return the queue depth and wait time metrics of the limiter."""
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self._max_queue_depth,
+            "commands": self._commands,
+            "delayed_commands": self._delayed,
+            "average_wait": self._total_wait / self._delayed if self._delayed else 0.0,
+            "max_wait": self._max_wait,
+        }
@@ -0,0 +1,71 @@
+"""Topic router for the shared wildcard subscriptions of Pixie."""
+
+def split_topic(topic):
+    """Split a Pixie topic into the device part and the topic suffix.
+
+    pixie_abcdef/channel0 -> ("pixie_abcdef", "channel0")
+    """
+    device, _, suffix = topic.partition("/")
+    return device, suffix
+
+
+class PixieTopicRouter:
+    """Route messages of the wildcard subscriptions to their handlers.
+
+    The routes are kept in a two-level trie: the first level is the device
+    part of the topic (pixie_<device_id>), the second one is the rest of the
+    topic (channel0, attributes, status, ...). Every leaf holds a tuple of
+    handlers which is rebuilt when a route is added or removed, so matching
+    a message costs two dict lookups regardless of the number of devices.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._count = 0
+
+    def add(self, topic, handler):
+        """Add a route and return a function removing it."""
+        device, suffix = split_topic(topic)
+        node = self._routes.setdefault(device, {})
+        node[suffix] = node.get(suffix, ()) + (handler,)
+        self._count += 1
+
+        def remove():
+            self._remove(device, suffix, handler)
+
+        return remove
+
+    def _remove(self, device, suffix, handler):
+        node = self._routes.get(device)
+        if node is None:
+            return
+
+        handlers = node.get(suffix, ())
+        if handler not in handlers:
+            return
+
+        index = handlers.index(handler)
+        handlers = handlers[:index] + handlers[index + 1:]
+        self._count -= 1
+
+        if handlers:
+            node[suffix] = handlers
+            return
+
+        del node[suffix]
+        if not node:
+            del self._routes[device]
+
+    def match(self, topic):
+        """Return the handlers of a topic; an empty tuple if there are none."""
+        device, _, suffix = topic.partition("/")
+        node = self._routes.get(device)
+        if node is None:
+            return ()
+        return node.get(suffix, ())
+
+    def devices(self):
+        return len(self._routes)
+
+    def __len__(self):
+        return self._count
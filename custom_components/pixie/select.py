@@ -56,6 +56,11 @@ class PixiePictureSelect(SelectEntity):
         self._coordinator.picture_select_callback(self.state_update_callback)
         await self._coordinator.async_mqtt_handler()
 
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe from MQTT events."""
+        self._coordinator.picture_select_callback(None)
+        self._coordinator.async_mqtt_release()
+
     @property
     def available(self):
         """Return the availability of the light."""
@@ -98,6 +103,11 @@ class PixieEffectSelect(SelectEntity):
         self._coordinator.effect_select_callback(self.state_update_callback)
         await self._coordinator.async_mqtt_handler()
 
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe from MQTT events."""
+        self._coordinator.effect_select_callback(None)
+        self._coordinator.async_mqtt_release()
+
     @property
     def available(self):
         """Return the availability of the light."""
@@ -4,14 +4,22 @@ import logging
 import json
 import voluptuous as vol
 
-from homeassistant.components.sensor import DEVICE_CLASS_CURRENT, SensorEntity
+from homeassistant.components.sensor import (
+    DOMAIN as SENSOR_DOMAIN,
+    DEVICE_CLASS_CURRENT,
+    STATE_CLASS_MEASUREMENT,
+    SensorEntity,
+)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     DEVICE_CLASS_TEMPERATURE,
     DEVICE_CLASS_TIMESTAMP,
     TEMP_CELSIUS,
+    TIME_MILLISECONDS,
 )
 from homeassistant.core import HomeAssistant, HomeAssistantError, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.components import mqtt
 from homeassistant.util.dt import utcnow
@@ -34,18 +42,33 @@ async def async_setup_entry( hass: HomeAssistant, config_entry: ConfigEntry, asy
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
     board_temperature_sensor = PixieBoardTemperatureSensor(coordinator)
-    uptime_sensor = PixieUptimeSensor(coordinator)
 
-    sensors = [ board_temperature_sensor, uptime_sensor ]
+    sensors = [ board_temperature_sensor ]
 
     async_add_entities(sensors)
 
+    # The uptime sensor used to exist once per channel, it belongs to the device now
+    registry = er.async_get(hass)
+    old_uptime_entity_id = registry.async_get_entity_id(
+        SENSOR_DOMAIN, DOMAIN, f"pixie_{coordinator.device_id()}_{coordinator.channel()}_uptime"
+    )
+    if old_uptime_entity_id is not None:
+        _LOGGER.info("Remove the channel uptime sensor %s", old_uptime_entity_id)
+        registry.async_remove(old_uptime_entity_id)
+
+    hub = coordinator.hub()
+    hub.async_add_device_entities(
+        coordinator, SENSOR_DOMAIN,
+        lambda: async_add_entities([PixieUptimeSensor(hub), PixieCommandLatencySensor(hub)]),
+    )
+
 
 class PixieBoardTemperatureSensor(SensorEntity):
     """Defines a Pixie board temperature sensor."""
 
     _attr_native_unit_of_measurement = TEMP_CELSIUS
     _attr_device_class = DEVICE_CLASS_TEMPERATURE
+    _attr_state_class = STATE_CLASS_MEASUREMENT
     _attr_icon = "mdi:thermometer"
     _attr_entity_registry_enabled_default = False
 
@@ -64,11 +87,29 @@ class PixieBoardTemperatureSensor(SensorEntity):
         self._coordinator.board_temp_sensor_callback(self.state_update_callback)
         await self._coordinator.async_mqtt_handler()
 
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe from MQTT events."""
+        self._coordinator.board_temp_sensor_callback(None)
+        self._coordinator.async_mqtt_release()
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
         return self._coordinator.board_temperature()
 
+    @property
+    def extra_state_attributes(self):
+        """Return the statistics of the last window if they are enabled."""
+        statistics = self._coordinator.board_temperature_statistics()
+        if statistics is None:
+            return None
+        return {
+            "min": statistics["min"],
+            "max": statistics["max"],
+            "mean": statistics["mean"],
+            "samples": statistics["samples"],
+        }
+
     @property
     def available(self):
         """Return the availability of the sensor."""
@@ -76,33 +117,91 @@ class PixieBoardTemperatureSensor(SensorEntity):
 
 
 class PixieUptimeSensor(SensorEntity):
-    """Defines a Pixie uptime sensor."""
+    """Defines a Pixie uptime sensor.
+
+    The state is the boot time of the device, it only changes when the
+    device reboots rather than with every uptime report.
+    """
 
+    _attr_device_class = DEVICE_CLASS_TIMESTAMP
     _attr_entity_registry_enabled_default = False
     _attr_icon = "mdi:clock-outline"
 
-    def __init__(self, coordinator):
-        self._coordinator = coordinator
-        self._device_id = coordinator.device_id()
-        self._channel = coordinator.channel()
-        self._attr_name = f"Pixie {self._device_id} {self._channel} Uptime"
-        self._attr_unique_id = f"pixie_{self._device_id}_{self._channel}_uptime"
+    def __init__(self, hub):
+        self._hub = hub
+        self._device_id = hub.device_id()
+        self._attr_name = f"Pixie {self._device_id} Uptime"
+        self._attr_unique_id = f"pixie_{self._device_id}_uptime"
 
     def state_update_callback(self):
         self.async_write_ha_state()
 
     async def async_added_to_hass(self):
-        """Subscribe to MQTT events."""
-        self._coordinator.uptime_sensor_callback(self.state_update_callback)
-        await self._coordinator.async_mqtt_handler()
+        self._hub.uptime_sensor_callback(self.state_update_callback)
+
+    async def async_will_remove_from_hass(self):
+        self._hub.uptime_sensor_callback(None)
 
     @property
     def native_value(self):
-        """Return the state of the sensor."""
-        return self._coordinator.uptime()
+        """Return the boot time of the device."""
+        return self._hub.boot_time()
 
     @property
     def available(self):
         """Return the availability of the sensor."""
-        return self._coordinator.available()
+        return self._hub.available()
+
+    @property
+    def device_info(self):
+        return self._hub.device_info()
+
+
+class PixieCommandLatencySensor(SensorEntity):
+    """Defines a sensor of the time a Pixie device takes to act on a command.
 
+    The state is the median, the other percentiles are attributes.
+    """
+
+    _attr_native_unit_of_measurement = TIME_MILLISECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:timer-outline"
+
+    def __init__(self, hub):
+        self._hub = hub
+        self._device_id = hub.device_id()
+        self._attr_name = f"Pixie {self._device_id} Command Latency"
+        self._attr_unique_id = f"pixie_{self._device_id}_command_latency"
+
+    def state_update_callback(self):
+        self.async_write_ha_state()
+
+    async def async_added_to_hass(self):
+        self._hub.latency_sensor_callback(self.state_update_callback)
+
+    async def async_will_remove_from_hass(self):
+        self._hub.latency_sensor_callback(None)
+
+    @property
+    def native_value(self):
+        """Return the median latency."""
+        return self._hub.command_latency()["p50"]
+
+    @property
+    def extra_state_attributes(self):
+        latency = self._hub.command_latency()
+        return {
+            "p95": latency["p95"],
+            "p99": latency["p99"],
+            "max": latency["max"],
+            "count": latency["count"],
+        }
+
+    @property
+    def available(self):
+        """Return the availability of the sensor."""
+        return self._hub.available()
+
+    @property
+    def device_info(self):
+        return self._hub.device_info()
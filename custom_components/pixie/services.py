@@ -0,0 +1,273 @@
+"""Domain services of the Pixie integration."""
+import asyncio
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components.light import ATTR_RGB_COLOR, DOMAIN as LIGHT_DOMAIN
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+
+from .encoder import PixieCommand
+from .const import (
+    DOMAIN,
+    CONF_DEVICE_ID,
+    CONF_NAME,
+    CONF_PERSIST,
+    CONF_ENTITIES,
+    CONF_MAX_PARALLEL,
+    DEFAULT_MAX_PARALLEL,
+    EVENT_SCENE_APPLIED,
+    DATA_SNAPSHOTS,
+    PIXIE_ATTR_STATE,
+    PIXIE_ATTR_CHANNELS,
+    PIXIE_ATTR_TRANSITION_NAME,
+    PIXIE_ATTR_TRANSITION,
+    PIXIE_ATTR_PICTURE,
+    PIXIE_ATTR_EFFECT,
+    PIXIE_ATTR_PARAMETER1,
+    PIXIE_ATTR_PARAMETER2,
+    PIXIE_ATTR_BRIGHTNESS,
+    PIXIE_ATTR_WHITE_VALUE,
+    SERVICE_SET_CHANNELS,
+    SERVICE_APPLY_SCENE,
+    SERVICE_SNAPSHOT,
+    SERVICE_RESTORE,
+    PIXIE_CHANNELS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# The settings of a command shared by the services
+COMMAND_FIELDS = {
+    vol.Optional(PIXIE_ATTR_STATE, default=True): cv.boolean,
+    vol.Exclusive(PIXIE_ATTR_EFFECT, "mode"): cv.string,
+    vol.Exclusive(PIXIE_ATTR_PICTURE, "mode"): cv.string,
+    vol.Exclusive(PIXIE_ATTR_TRANSITION_NAME, "mode"): cv.string,
+    vol.Optional(PIXIE_ATTR_TRANSITION): vol.All( vol.Coerce(int), vol.Range(min=0, max=4096) ),
+    vol.Optional(PIXIE_ATTR_PARAMETER1): vol.All( vol.Coerce(int), vol.Range(min=0, max=255) ),
+    vol.Optional(PIXIE_ATTR_PARAMETER2): vol.All( vol.Coerce(int), vol.Range(min=0, max=255) ),
+    vol.Optional(PIXIE_ATTR_BRIGHTNESS): vol.All( vol.Coerce(int), vol.Range(min=0, max=255) ),
+    vol.Optional(ATTR_RGB_COLOR): vol.All(
+        vol.ExactSequence((cv.byte,) * 3), vol.Coerce(tuple)
+    ),
+}
+
+SET_CHANNELS_SCHEMA = vol.Schema({
+    vol.Required(CONF_DEVICE_ID): vol.All( cv.string, vol.Match(r"^[0-9A-Fa-f]{6}$") ),
+    vol.Optional(PIXIE_ATTR_CHANNELS): vol.All( cv.ensure_list, [vol.All( vol.Coerce(int), vol.In(PIXIE_CHANNELS) )] ),
+    **COMMAND_FIELDS,
+})
+
+APPLY_SCENE_SCHEMA = vol.Schema({
+    vol.Required(CONF_ENTITIES): vol.All(
+        cv.ensure_list, [vol.Schema({vol.Required(ATTR_ENTITY_ID): cv.entity_id, **COMMAND_FIELDS})]
+    ),
+    vol.Optional(CONF_MAX_PARALLEL, default=DEFAULT_MAX_PARALLEL): vol.All( vol.Coerce(int), vol.Range(min=1) ),
+})
+
+SNAPSHOT_SCHEMA = vol.Schema({
+    vol.Required(CONF_NAME): cv.string,
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Optional(CONF_PERSIST, default=False): cv.boolean,
+})
+
+RESTORE_SCHEMA = vol.Schema({
+    vol.Required(CONF_NAME): cv.string,
+    vol.Optional(CONF_MAX_PARALLEL, default=DEFAULT_MAX_PARALLEL): vol.All( vol.Coerce(int), vol.Range(min=1) ),
+})
+
+
+def _get_hub(hass, device_id):
+    return hass.data.get(DOMAIN, {}).get(f"hub_{device_id}")
+
+
+def _get_coordinator(hass, registry, entity_id):
+    """Return the coordinator of a Pixie light, None if it is not one."""
+    entry = registry.async_get(entity_id)
+    if entry is None or entry.platform != DOMAIN or entry.domain != LIGHT_DOMAIN:
+        return None
+    return hass.data.get(DOMAIN, {}).get(entry.config_entry_id)
+
+
+def _is_group_light(registry, entity_id, coordinator):
+    return registry.async_get(entity_id).unique_id == f"pixie_{coordinator.device_id()}_all"
+
+
+def _all_coordinators(hass):
+    for key, hub in hass.data.get(DOMAIN, {}).items():
+        if key.startswith("hub_"):
+            yield from hub.coordinators()
+
+
+def _snapshot_settings(snapshot):
+    """Return the command settings which restore the snapshot of a channel."""
+    if not snapshot["state"]:
+        return {PIXIE_ATTR_STATE: False}
+
+    settings = {
+        PIXIE_ATTR_STATE: True,
+        PIXIE_ATTR_BRIGHTNESS: snapshot["brightness"],
+        ATTR_RGB_COLOR: tuple(snapshot["rgb"]),
+        PIXIE_ATTR_WHITE_VALUE: snapshot["white_value"],
+        PIXIE_ATTR_PARAMETER1: snapshot["parameter1"],
+        PIXIE_ATTR_PARAMETER2: snapshot["parameter2"],
+    }
+    if snapshot["effect"]:
+        settings[PIXIE_ATTR_EFFECT] = snapshot["effect"]
+    elif snapshot["picture"]:
+        settings[PIXIE_ATTR_PICTURE] = snapshot["picture"]
+    return settings
+
+
+def _build_command(settings):
+    settings = dict(settings)
+    return PixieCommand.build(settings.pop(PIXIE_ATTR_STATE), **settings)
+
+
+class PixieScene:
+    """Commands of a scene grouped by device.
+
+    Entities with the same settings share one PixieCommand, so every
+    distinct payload is encoded once. Channels of a device with the same
+    settings are sent together through the hub.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        self._devices = {}
+
+    def add(self, hub, channel, settings):
+        """Add a channel of a device, channel=None addresses all channels."""
+        key = tuple(sorted(settings.items()))
+        command = self._commands.get(key)
+        if command is None:
+            command = self._commands[key] = _build_command(settings)
+
+        channels = self._devices.setdefault(hub, {}).setdefault(key, (command, set()))[1]
+        channels.add(channel)
+
+    def devices(self):
+        return len(self._devices)
+
+    async def async_apply(self, max_parallel):
+        """Publish the commands of all devices, at most max_parallel devices at a time."""
+        semaphore = asyncio.Semaphore(max_parallel)
+
+        async def async_apply_device(hub, commands):
+            async with semaphore:
+                await asyncio.gather(*(
+                    hub.async_publish_channels(command, None if None in channels else channels, 0, False)
+                    for command, channels in commands.values()
+                ))
+
+        await asyncio.gather(*(
+            async_apply_device(hub, commands) for hub, commands in self._devices.items()
+        ))
+
+
+@callback
+def async_setup_services(hass):
+    """Register the services which are not bound to an entity."""
+
+    async def async_set_channels(call):
+        """Send one command to several channels of a device."""
+        data = dict(call.data)
+        device_id = data.pop(CONF_DEVICE_ID)
+        channels = data.pop(PIXIE_ATTR_CHANNELS, None)
+
+        hub = _get_hub(hass, device_id)
+        if hub is None:
+            _LOGGER.warning("[%s] The device is not configured, the service pixie.set_channels is ignored", device_id)
+            return
+
+        await hub.async_publish_channels(_build_command(data), channels, 0, False)
+
+    async def async_apply_scene(call):
+        """Apply the settings of many Pixie lights in one burst."""
+        started = hass.loop.time()
+        registry = er.async_get(hass)
+
+        scene = PixieScene()
+        for settings in call.data[CONF_ENTITIES]:
+            settings = dict(settings)
+            entity_id = settings.pop(ATTR_ENTITY_ID)
+
+            coordinator = _get_coordinator(hass, registry, entity_id)
+            if coordinator is None:
+                _LOGGER.warning("The entity %s is not a Pixie light, skipping it in the scene", entity_id)
+                continue
+
+            if _is_group_light(registry, entity_id, coordinator):
+                scene.add(coordinator.hub(), None, settings)
+            else:
+                scene.add(coordinator.hub(), coordinator.channel(), settings)
+
+        await scene.async_apply(call.data[CONF_MAX_PARALLEL])
+
+        duration = hass.loop.time() - started
+        _LOGGER.debug("Applied a scene to %s devices in %.3f s", scene.devices(), duration)
+        hass.bus.async_fire(EVENT_SCENE_APPLIED, {
+            "entities": len(call.data[CONF_ENTITIES]),
+            "devices": scene.devices(),
+            "duration": duration,
+        })
+
+    @callback
+    def async_snapshot(call):
+        """Save the state of Pixie channels under a name."""
+        if ATTR_ENTITY_ID in call.data:
+            registry = er.async_get(hass)
+            coordinators = []
+            for entity_id in call.data[ATTR_ENTITY_ID]:
+                coordinator = _get_coordinator(hass, registry, entity_id)
+                if coordinator is None:
+                    _LOGGER.warning("The entity %s is not a Pixie light, skipping it in the snapshot", entity_id)
+                elif _is_group_light(registry, entity_id, coordinator):
+                    coordinators.extend(coordinator.hub().coordinators())
+                else:
+                    coordinators.append(coordinator)
+        else:
+            coordinators = _all_coordinators(hass)
+
+        channels = {
+            f"{coordinator.device_id()}_{coordinator.channel()}": coordinator.snapshot()
+            for coordinator in coordinators
+        }
+        hass.data[DATA_SNAPSHOTS].async_set(call.data[CONF_NAME], channels, call.data[CONF_PERSIST])
+        _LOGGER.debug("Saved the snapshot %s of %s channels", call.data[CONF_NAME], len(channels))
+
+    async def async_restore(call):
+        """Restore the state of the channels saved in a snapshot."""
+        name = call.data[CONF_NAME]
+        channels = hass.data[DATA_SNAPSHOTS].get(name)
+        if channels is None:
+            _LOGGER.warning("There is no snapshot %s to restore", name)
+            return
+
+        scene = PixieScene()
+        for key, snapshot in channels.items():
+            device_id, _, channel = key.rpartition("_")
+            hub = _get_hub(hass, device_id)
+            if hub is None:
+                _LOGGER.debug("[%s] The device is not configured anymore, skipping it", device_id)
+                continue
+            scene.add(hub, int(channel), _snapshot_settings(snapshot))
+
+        await scene.async_apply(call.data[CONF_MAX_PARALLEL])
+        _LOGGER.debug("Restored the snapshot %s on %s devices", name, scene.devices())
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_CHANNELS, async_set_channels, schema=SET_CHANNELS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_APPLY_SCENE, async_apply_scene, schema=APPLY_SCENE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SNAPSHOT, async_snapshot, schema=SNAPSHOT_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RESTORE, async_restore, schema=RESTORE_SCHEMA
+    )
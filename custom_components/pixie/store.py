@@ -0,0 +1,129 @@
+"""Persisted state cache of Pixie channels and devices."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = "pixie.state"
+SNAPSHOTS_STORAGE_KEY = "pixie.snapshots"
+
+# Changes within this delay (in seconds) are written together
+SAVE_DELAY = 10
+
+
+class PixieStateStore:
+    """Keep the last known state of the channels and devices in HA storage.
+
+    Coordinators and hubs restore from the store when they are created, so
+    the entities show the last known state right after a restart. Live MQTT
+    data reconciles it afterwards. Writes are debounced: every change only
+    schedules a save which collects the state of all channels and devices.
+    """
+
+    def __init__(self, hass):
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data = {"channels": {}, "devices": {}}
+        self._snapshots = {"channels": {}, "devices": {}}
+
+    async def async_load(self):
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._data["channels"] = data.get("channels", {})
+            self._data["devices"] = data.get("devices", {})
+        _LOGGER.debug(
+            "Loaded the cached state of %s channels and %s devices",
+            len(self._data["channels"]), len(self._data["devices"]),
+        )
+
+    def channel(self, device_id, channel):
+        """Return the cached state of a channel, None if there is none."""
+        return self._data["channels"].get(f"{device_id}_{channel}")
+
+    def device(self, device_id):
+        """Return the cached state of a device, None if there is none."""
+        return self._data["devices"].get(device_id)
+
+    @callback
+    def async_track_channel(self, device_id, channel, snapshot):
+        """Save the state returned by snapshot() for a channel."""
+        self._snapshots["channels"][f"{device_id}_{channel}"] = snapshot
+
+    @callback
+    def async_track_device(self, device_id, snapshot):
+        """Save the state returned by snapshot() for a device."""
+        self._snapshots["devices"][device_id] = snapshot
+
+    @callback
+    def async_untrack_channel(self, device_id, channel):
+        key = f"{device_id}_{channel}"
+        snapshot = self._snapshots["channels"].pop(key, None)
+        if snapshot is not None:
+            self._data["channels"][key] = snapshot()
+
+    @callback
+    def async_untrack_device(self, device_id):
+        snapshot = self._snapshots["devices"].pop(device_id, None)
+        if snapshot is not None:
+            self._data["devices"][device_id] = snapshot()
+
+    @callback
+    def async_remove_channel(self, device_id, channel):
+        """Forget a channel which has been removed from Home Assistant."""
+        self._data["channels"].pop(f"{device_id}_{channel}", None)
+        self.async_schedule_save()
+
+    @callback
+    def async_schedule_save(self):
+        """Schedule a debounced write of the state of all channels and devices."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        for kind, snapshots in self._snapshots.items():
+            for key, snapshot in snapshots.items():
+                self._data[kind][key] = snapshot()
+        return self._data
+
+
+class PixieSnapshotStore:
+    """Named snapshots of the state of Pixie channels.
+
+    A snapshot maps "<device_id>_<channel>" to the snapshot() of the
+    coordinator. Snapshots live in memory, the ones created with persist
+    survive a restart of Home Assistant.
+    """
+
+    def __init__(self, hass):
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, SNAPSHOTS_STORAGE_KEY)
+        self._snapshots = {}
+        self._persisted = set()
+
+    async def async_load(self):
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._snapshots.update(data)
+            self._persisted.update(data)
+
+    def get(self, name):
+        """Return the channels of a snapshot, None if there is none."""
+        return self._snapshots.get(name)
+
+    @callback
+    def async_set(self, name, channels, persist):
+        self._snapshots[name] = channels
+        if persist:
+            self._persisted.add(name)
+        elif name in self._persisted:
+            self._persisted.discard(name)
+        else:
+            return
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        return {name: self._snapshots[name] for name in self._persisted}
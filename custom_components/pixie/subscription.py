@@ -0,0 +1,177 @@
+"""Reference-counted MQTT subscriptions for Pixie."""
+import asyncio
+import logging
+
+from homeassistant.components import mqtt
+from homeassistant.core import HassJob, callback
+
+from .router import PixieTopicRouter, split_topic
+from .const import DATA_WILDCARD
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PixieSubscription:
+    """A single MQTT subscription shared by several users."""
+
+    __slots__ = ("refcount", "unsubscribe")
+
+    def __init__(self):
+        self.refcount = 1
+        self.unsubscribe = None
+
+
+class PixieSubscriptionRegistry:
+    """Subscribe to every MQTT topic once and count the users of it.
+
+    If the wildcard subscription mode is enabled the topics are routed from
+    the shared wildcard subscriptions instead of being subscribed one by one.
+    """
+
+    def __init__(self, hass, qos=0):
+        self.hass = hass
+        self.qos = qos
+        self._wildcard = hass.data.get(DATA_WILDCARD)
+        self._subscriptions = {}
+
+    async def async_subscribe(self, topic, msg_callback):
+        """Subscribe to a topic or add a user to an existing subscription.
+
+        Return True if a new MQTT subscription has been made.
+        """
+        subscription = self._subscriptions.get(topic)
+        if subscription is not None:
+            subscription.refcount += 1
+            return False
+
+        # Register the subscription before awaiting so concurrent users share it
+        subscription = PixieSubscription()
+        self._subscriptions[topic] = subscription
+
+        if self._wildcard is not None:
+            _LOGGER.debug("Route the topic %s", topic)
+            unsubscribe = await self._wildcard.async_add_route(topic, msg_callback)
+        else:
+            _LOGGER.info("Subscribe to the topic %s", topic)
+            unsubscribe = await mqtt.async_subscribe(self.hass, topic, msg_callback, self.qos)
+
+        if self._subscriptions.get(topic) is not subscription:
+            # All users went away while the subscription was being made
+            unsubscribe()
+            return False
+
+        subscription.unsubscribe = unsubscribe
+        return True
+
+    @callback
+    def async_release(self, topic):
+        """Remove a user of a topic and unsubscribe when nobody uses it anymore."""
+        subscription = self._subscriptions.get(topic)
+        if subscription is None:
+            return
+
+        subscription.refcount -= 1
+        if subscription.refcount > 0:
+            return
+
+        del self._subscriptions[topic]
+        if subscription.unsubscribe is not None:
+            _LOGGER.info("Unsubscribe from the topic %s", topic)
+            subscription.unsubscribe()
+
+    @callback
+    def async_unsubscribe_all(self):
+        """Drop all subscriptions regardless of their users."""
+        subscriptions = self._subscriptions
+        self._subscriptions = {}
+        for topic, subscription in subscriptions.items():
+            if subscription.unsubscribe is not None:
+                _LOGGER.info("Unsubscribe from the topic %s", topic)
+                subscription.unsubscribe()
+
+
+class PixieWildcardSubscriber:
+    """Receive the messages of all Pixie devices through wildcard subscriptions.
+
+    Instead of one subscription per device topic there is one subscription
+    per topic suffix (+/status, +/attributes, +/channel0, ...) shared by the
+    whole fleet, and a PixieTopicRouter dispatches every message to the
+    handlers of its device.
+
+    The broker only sends the retained messages when a subscription is made,
+    so a route added to an existing wildcard subscription would miss them.
+    The last message of every Pixie topic is kept and replayed to a new route
+    instead, this covers the retained status (LWT) and channel states.
+    """
+
+    def __init__(self, hass, qos=0):
+        self.hass = hass
+        self.qos = qos
+        self._router = PixieTopicRouter()
+        self._suffixes = {}
+        self._last_messages = {}
+        self._lock = asyncio.Lock()
+
+    async def async_add_route(self, topic, msg_callback):
+        """Route a topic to a handler and return a function removing the route."""
+        _, suffix = split_topic(topic)
+
+        job = HassJob(msg_callback)
+        remove_route = self._router.add(topic, job)
+
+        async with self._lock:
+            subscription = self._suffixes.get(suffix)
+            if subscription is not None:
+                subscription.refcount += 1
+                last_message = self._last_messages.get(topic)
+                if last_message is not None:
+                    _LOGGER.debug("Replay the last message of the topic %s", topic)
+                    self.hass.async_run_hass_job(job, last_message)
+            else:
+                subscription = PixieSubscription()
+                self._suffixes[suffix] = subscription
+                wildcard_topic = f"+/{suffix}"
+                _LOGGER.info("Subscribe to the topic %s", wildcard_topic)
+                unsubscribe = await mqtt.async_subscribe(
+                    self.hass, wildcard_topic, self._message_received, self.qos
+                )
+                if self._suffixes.get(suffix) is subscription:
+                    subscription.unsubscribe = unsubscribe
+                else:
+                    unsubscribe()
+
+        @callback
+        def async_remove():
+            remove_route()
+            self._async_release_suffix(suffix)
+
+        return async_remove
+
+    @callback
+    def _async_release_suffix(self, suffix):
+        subscription = self._suffixes.get(suffix)
+        if subscription is None:
+            return
+
+        subscription.refcount -= 1
+        if subscription.refcount > 0:
+            return
+
+        del self._suffixes[suffix]
+        self._last_messages = {
+            topic: msg for topic, msg in self._last_messages.items() if split_topic(topic)[1] != suffix
+        }
+        if subscription.unsubscribe is not None:
+            _LOGGER.info("Unsubscribe from the topic +/%s", suffix)
+            subscription.unsubscribe()
+
+    @callback
+    def _message_received(self, msg):
+        if msg.topic.startswith("pixie_"):
+            if msg.payload:
+                self._last_messages[msg.topic] = msg
+            else:
+                # An empty retained message clears the retained one
+                self._last_messages.pop(msg.topic, None)
+        for job in self._router.match(msg.topic):
+            self.hass.async_run_hass_job(job, msg)
@@ -0,0 +1,112 @@
+"""Tracking of the state and attribute requests sent to a Pixie device."""
+import asyncio
+import logging
+import random
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds to wait for the reply to a request
+REQUEST_TIMEOUT = 5
+# Number of retries after the first request
+REQUEST_RETRIES = 4
+# Base of the exponential backoff between the retries in seconds
+REQUEST_BACKOFF = 2
+
+
+class PixieRequestTracker:
+    """Correlate the /get requests of a device with their replies.
+
+    A request is repeated with exponential backoff and jitter until the
+    reply arrives, the retries are exhausted or the device reports that it
+    is offline, on_give_up() is called then. The round-trip time of the
+    answered requests is recorded.
+    """
+
+    def __init__(self, loop, device_id, is_offline, on_give_up):
+        self._loop = loop
+        self._device_id = device_id
+        self._is_offline = is_offline
+        self._on_give_up = on_give_up
+        self._pending = {}
+
+        self._replies = 0
+        self._timeouts = 0
+        self._last_rtt = None
+        self._min_rtt = None
+        self._max_rtt = None
+        self._total_rtt = 0.0
+
+    async def async_request(self, key, publish):
+        """Publish a request with publish() and wait for its reply."""
+        if key in self._pending:
+            return
+
+        future = self._loop.create_future()
+        self._pending[key] = (future, asyncio.current_task())
+        try:
+            await self._async_request(key, publish, future)
+        finally:
+            self._pending.pop(key, None)
+
+    async def _async_request(self, key, publish, future):
+        for attempt in range(REQUEST_RETRIES + 1):
+            if self._is_offline():
+                _LOGGER.debug("[%s] The device is offline, giving up the request %s", self._device_id, key)
+                self._on_give_up()
+                return
+
+            sent = self._loop.time()
+            await publish()
+
+            done, _ = await asyncio.wait((future,), timeout=REQUEST_TIMEOUT)
+            if not done and attempt < REQUEST_RETRIES:
+                self._timeouts += 1
+                delay = REQUEST_BACKOFF * 2 ** attempt
+                delay += random.uniform(0, delay)
+                _LOGGER.debug("[%s] No reply to the request %s, retrying in %.1f s", self._device_id, key, delay)
+                # A late reply still counts while waiting for the next attempt
+                done, _ = await asyncio.wait((future,), timeout=delay)
+
+            if done:
+                self._record(self._loop.time() - sent)
+                return
+
+        self._timeouts += 1
+        _LOGGER.warning("[%s] No reply to the request %s after %s attempts", self._device_id, key, REQUEST_RETRIES + 1)
+        self._on_give_up()
+
+    def _record(self, rtt):
+        self._replies += 1
+        self._last_rtt = rtt
+        self._total_rtt += rtt
+        self._min_rtt = rtt if self._min_rtt is None else min(self._min_rtt, rtt)
+        self._max_rtt = rtt if self._max_rtt is None else max(self._max_rtt, rtt)
+
+    def resolve(self, key):
+        """Handle the reply to a request."""
+        pending = self._pending.get(key)
+        if pending is not None and not pending[0].done():
+            pending[0].set_result(None)
+
+    def cancel(self, key=None):
+        """Cancel the running request of a key, all requests if key is None."""
+        if key is not None:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[1].cancel()
+            return
+
+        for _, task in list(self._pending.values()):
+            task.cancel()
+
+    def metrics(self):
+        """Return the round-trip time metrics of the requests."""
+        return {
+            "pending_requests": len(self._pending),
+            "replies": self._replies,
+            "timeouts": self._timeouts,
+            "last_rtt": self._last_rtt,
+            "min_rtt": self._min_rtt,
+            "max_rtt": self._max_rtt,
+            "average_rtt": self._total_rtt / self._replies if self._replies else None,
+        }
@@ -74,6 +74,12 @@ class PixieUpdateEntity(UpdateEntity):
         await self._coordinator.async_mqtt_handler()
 
 
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe from MQTT events."""
+        self._coordinator.ota_callback(None)
+        self._coordinator.async_mqtt_release()
+
+
     def state_update_callback(self):
         self._attr_in_progress = self._coordinator.ota_in_progress()
         self.async_write_ha_state()
@@ -0,0 +1,122 @@
+"""Availability watchdog based on the last message of every Pixie device."""
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of slots of the timer wheel
+WHEEL_SLOTS = 64
+# Number of ticks per timeout, a device is marked stale within one tick of it
+TICKS_PER_TIMEOUT = 16
+
+
+class _WatchedDevice:
+    __slots__ = ("deadline", "probed", "stale", "on_probe", "on_stale")
+
+    def __init__(self, deadline, on_probe, on_stale):
+        self.deadline = deadline
+        self.probed = False
+        self.stale = False
+        self.on_probe = on_probe
+        self.on_stale = on_stale
+
+
+class PixieWatchdog:
+    """Mark devices stale which have not sent any message within a timeout.
+
+    All devices share one timer wheel driven by a single timer. A message
+    only moves the deadline of its device, the device is moved to the slot
+    of the new deadline when its old slot comes up. So a message costs O(1)
+    and a tick only looks at the devices of one slot. With probe enabled a
+    device is asked for its attributes first and only marked stale if it
+    does not answer within a quarter of the timeout either.
+    """
+
+    def __init__(self, loop, timeout, probe):
+        self._loop = loop
+        self._timeout = timeout
+        self._probe = probe
+        self._tick = timeout / TICKS_PER_TIMEOUT
+        self._wheel = [set() for _ in range(WHEEL_SLOTS)]
+        self._devices = {}
+        self._position = self._ticks(loop.time())
+        self._timer = None
+
+    def _ticks(self, time):
+        return int(time / self._tick)
+
+    def add(self, device_id, on_probe, on_stale):
+        """Watch a device, on_probe() and on_stale() are called when it is silent."""
+        device = _WatchedDevice(self._loop.time() + self._timeout, on_probe, on_stale)
+        self._devices[device_id] = device
+        self._schedule(device_id, device)
+
+    def remove(self, device_id):
+        self._devices.pop(device_id, None)
+        if not self._devices and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def touch(self, device_id):
+        """Handle a message of a device, return True if it was stale."""
+        device = self._devices.get(device_id)
+        if device is None:
+            return False
+
+        device.deadline = self._loop.time() + self._timeout
+        device.probed = False
+        if not device.stale:
+            return False
+
+        device.stale = False
+        self._schedule(device_id, device)
+        return True
+
+    def _schedule(self, device_id, device):
+        self._wheel[self._ticks(device.deadline) % WHEEL_SLOTS].add(device_id)
+        if self._timer is None:
+            self._position = self._ticks(self._loop.time())
+            self._timer = self._loop.call_later(self._tick, self._on_tick)
+
+    def _on_tick(self):
+        self._timer = None
+        now = self._loop.time()
+        current = self._ticks(now)
+        # A late tick processes the slots it has missed, a whole round at most
+        first = max(self._position + 1, current - WHEEL_SLOTS + 1)
+        for position in range(first, current + 1):
+            self._process(position, now)
+        self._position = current
+
+        if self._devices:
+            self._timer = self._loop.call_later(self._tick, self._on_tick)
+
+    def _process(self, position, now):
+        slot = self._wheel[position % WHEEL_SLOTS]
+        for device_id in list(slot):
+            device = self._devices.get(device_id)
+            if device is None or device.stale:
+                slot.discard(device_id)
+                continue
+
+            deadline = self._ticks(device.deadline)
+            if deadline > position:
+                # Touched since it was scheduled or due in a later round
+                target = self._wheel[deadline % WHEEL_SLOTS]
+                if target is not slot:
+                    slot.discard(device_id)
+                    target.add(device_id)
+                continue
+
+            slot.discard(device_id)
+            if self._probe and not device.probed:
+                device.probed = True
+                device.deadline = now + self._timeout / 4
+                self._wheel[self._ticks(device.deadline) % WHEEL_SLOTS].add(device_id)
+                device.on_probe()
+                continue
+
+            device.stale = True
+            device.on_stale()
+
+    def stale_devices(self):
+        return sum(1 for device in self._devices.values() if device.stale)
@@ -0,0 +1,22 @@
+"""Helpers shared by the Pixie tests."""
+import importlib
+import os
+import sys
+import types
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custom_components", "pixie"
+)
+
+
+def load(module):
+    """Import a module of the integration which does not need Home Assistant.
+
+    The package __init__ sets up Home Assistant platforms, so the package is
+    registered without running it and only the requested module is imported.
+    """
+    if "pixie" not in sys.modules:
+        package = types.ModuleType("pixie")
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules["pixie"] = package
+    return importlib.import_module(f"pixie.{module}")
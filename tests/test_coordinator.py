@@ -0,0 +1,210 @@
+"""Tests of the command pipeline of a Pixie channel."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.pixie.const import (
+    CONF_CHANNEL,
+    CONF_COMMAND_WINDOW,
+    CONF_DELTA_COMMANDS,
+    CONF_DEVICE_ID,
+    CONF_OFFLINE_COMMAND_TTL,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_RETAINED_STATE,
+    DATA_BOOTSTRAP,
+    DATA_CONFIG,
+    DATA_STORE,
+)
+from custom_components.pixie.coordinator import PixieCoordinator
+from custom_components.pixie.encoder import PixieCommand
+from custom_components.pixie.ratelimit import PRIORITY_HIGH, PRIORITY_NORMAL
+
+OPTIMISTIC_TIMEOUT = 0.05
+
+
+class FakeHass:
+    def __init__(self, loop, config):
+        self.loop = loop
+        self.data = {
+            DATA_CONFIG: config,
+            DATA_STORE: FakeStore(),
+            DATA_BOOTSTRAP: None,
+        }
+
+    def async_create_task(self, coro):
+        return self.loop.create_task(coro)
+
+
+class FakeStore:
+    def channel(self, device_id, channel):
+        return None
+
+    def async_track_channel(self, device_id, channel, snapshot):
+        pass
+
+    def async_untrack_channel(self, device_id, channel):
+        pass
+
+    def async_schedule_save(self):
+        pass
+
+
+class FakeHub:
+    def __init__(self):
+        self.online = True
+        self.published = []
+
+    def available(self):
+        return self.online
+
+    async def async_publish(self, topic, payload, qos, retain, priority=PRIORITY_NORMAL, channels=()):
+        self.published.append((json.loads(payload), priority))
+
+    def channel_state_updated(self):
+        pass
+
+    def async_message_seen(self):
+        pass
+
+    def resolve_request(self, key):
+        pass
+
+    def cancel_request(self, key):
+        pass
+
+    def record_command_latency(self, seconds):
+        pass
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def make_coordinator(loop, optimistic=False, delta=False):
+    config = {
+        CONF_COMMAND_WINDOW: 0,
+        CONF_DELTA_COMMANDS: delta,
+        CONF_RETAINED_STATE: False,
+        CONF_OPTIMISTIC: optimistic,
+        CONF_OPTIMISTIC_TIMEOUT: OPTIMISTIC_TIMEOUT,
+        CONF_OFFLINE_COMMAND_TTL: 300,
+    }
+    hub = FakeHub()
+    entry = SimpleNamespace(data={CONF_DEVICE_ID: "abcdef", CONF_CHANNEL: 0})
+    return PixieCoordinator(FakeHass(loop, config), entry, hub), hub
+
+
+def receive_state(coordinator, **state):
+    payload = json.dumps(state)
+    coordinator._message_received(SimpleNamespace(topic=coordinator.channel_topic, payload=payload))
+
+
+def test_optimistic_state_is_rolled_back(loop):
+    coordinator, _ = make_coordinator(loop, optimistic=True)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=10), 0, False))
+    assert coordinator.state() is True
+    assert coordinator.brightness() == 10
+
+    loop.run_until_complete(asyncio.sleep(OPTIMISTIC_TIMEOUT * 2))
+    assert coordinator.state() is False
+    assert coordinator.brightness() == 255
+
+
+def test_echo_keeps_optimistic_state(loop):
+    coordinator, _ = make_coordinator(loop, optimistic=True)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=10), 0, False))
+    receive_state(coordinator, state="ON", brightness=10)
+
+    loop.run_until_complete(asyncio.sleep(OPTIMISTIC_TIMEOUT * 2))
+    assert coordinator.state() is True
+    assert coordinator.brightness() == 10
+
+
+def test_second_optimistic_command_rolls_back_to_confirmed_state(loop):
+    coordinator, _ = make_coordinator(loop, optimistic=True)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=10), 0, False))
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=20), 0, False))
+
+    loop.run_until_complete(asyncio.sleep(OPTIMISTIC_TIMEOUT * 2))
+    assert coordinator.state() is False
+    assert coordinator.brightness() == 255
+
+
+def test_optimistic_command_is_prioritized_against_confirmed_state(loop):
+    coordinator, hub = make_coordinator(loop, optimistic=True)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True), 0, False))
+
+    assert hub.published == [({"state": "ON"}, PRIORITY_HIGH)]
+
+
+def test_optimistic_delta_command_is_compared_against_confirmed_state(loop):
+    coordinator, hub = make_coordinator(loop, optimistic=True, delta=True)
+    receive_state(coordinator, state="OFF", brightness=255)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=10), 0, False))
+
+    assert hub.published == [({"state": "ON", "brightness": 10}, PRIORITY_HIGH)]
+
+
+def test_delta_skips_unchanged_command(loop):
+    coordinator, hub = make_coordinator(loop, delta=True)
+    receive_state(coordinator, state="ON", brightness=10)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=10), 0, False))
+
+    assert hub.published == []
+
+
+def test_delta_sends_command_after_stale_echo(loop):
+    coordinator, hub = make_coordinator(loop, delta=True)
+    receive_state(coordinator, state="ON", brightness=100)
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=60), 0, False))
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=50), 0, False))
+    # The echo of the first command arrives, the second one is still in flight
+    receive_state(coordinator, state="ON", brightness=60)
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=60), 0, False))
+
+    assert [payload for payload, _ in hub.published] == [
+        {"state": "ON", "brightness": 60},
+        {"state": "ON", "brightness": 50},
+        {"state": "ON", "brightness": 60},
+    ]
+
+
+def test_delta_sends_full_command_before_device_state(loop):
+    coordinator, hub = make_coordinator(loop, delta=True)
+    coordinator.restore({"state": True, "brightness": 255, "rgb": [255, 255, 255]})
+
+    command = PixieCommand.build(True, brightness=255, rgb_color=(255, 255, 255))
+    loop.run_until_complete(coordinator.publish_command(command, 0, False))
+
+    assert hub.published == [({"state": "ON", "brightness": 255, "color": {"r": 255, "g": 255, "b": 255}}, PRIORITY_NORMAL)]
+
+
+def test_offline_command_is_held_and_flushed(loop):
+    coordinator, hub = make_coordinator(loop)
+    hub.online = False
+
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=10), 0, False))
+    loop.run_until_complete(coordinator.publish_command(PixieCommand.build(True, brightness=20), 0, False))
+    assert hub.published == []
+    assert coordinator.offline_command_metrics()["pending"] is True
+
+    hub.online = True
+    coordinator.device_availability_updated()
+    loop.run_until_complete(asyncio.sleep(0))
+
+    assert hub.published == [({"state": "ON", "brightness": 20}, PRIORITY_HIGH)]
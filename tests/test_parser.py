@@ -0,0 +1,110 @@
+"""Tests of the parsers of the payloads published by Pixie devices."""
+import pytest
+
+from .common import load
+
+parser = load("parser")
+
+
+def test_channel_state():
+    state = parser.parse_channel_state(
+        '{"state":"ON","brightness":10,"color":{"r":1,"g":2,"b":3},"parameter1":4,"effect":"rainbow"}'
+    )
+
+    assert state.state is True
+    assert state.brightness == 10
+    assert state.rgb == (1, 2, 3)
+    assert state.parameter1 == 4
+    assert state.parameter2 is None
+    assert state.effect == "rainbow"
+    assert state.picture is None
+
+
+@pytest.mark.parametrize("payload", [
+    '{"brightness":10}',
+    '{"state":"DIM"}',
+    '{"state":1}',
+    '{"state":"ON","color":"red"}',
+    '{"state":"ON","color":[1,2,3]}',
+    '{"state":"ON","color":{"r":1,"g":2}}',
+    '{"state":"ON","brightness":256}',
+    '{"state":"ON","parameter1":-1}',
+    '{"state":"ON","color":{"r":1,"g":2,"b":300}}',
+    '{"state":"ON","brightness":"bright"}',
+    '{"state":"ON","effect":1}',
+    'ON',
+    '{"state":"ON"',
+    '',
+    '["state","ON"]',
+    'null',
+])
+def test_malformed_channel_state(payload):
+    assert parser.parse_channel_state(payload) is None
+
+
+def test_attributes():
+    attributes = parser.parse_attributes(
+        '{"board_temperature":41.5,"uptime":3600,"firmware_version":"1.2.3","ip_addr":"10.0.0.2"}'
+    )
+
+    assert attributes.board_temperature == 41.5
+    assert attributes.uptime == 3600
+    assert attributes.firmware_version == "1.2.3"
+    assert attributes.ip_addr == "10.0.0.2"
+    assert attributes.mac is None
+
+
+@pytest.mark.parametrize("payload", [
+    '{"uptime":true}',
+    '{"uptime":"3600"}',
+    '{"board_temperature":false}',
+    '{"firmware_version":123}',
+    'attributes',
+    '[1,2]',
+])
+def test_malformed_attributes(payload):
+    assert parser.parse_attributes(payload) is None
+
+
+@pytest.mark.parametrize("version, expected", [
+    ("1.2.3", 123),
+    ("0.3.0", 30),
+    ("1.2", None),
+    ("1.2.3.4", None),
+    ("1.x.3", None),
+    (123, None),
+    (None, None),
+])
+def test_parse_version(version, expected):
+    assert parser.parse_version(version) == expected
+
+
+def test_ota_reply():
+    reply = parser.parse_ota_reply(
+        '{"ota_state":"check","ota_type":"auto","result":0,"remote_version":"1.3.0","running_version":"1.2.3"}'
+    )
+
+    assert reply.ota_state == "check"
+    assert reply.result == 0
+    assert reply.remote_version == "1.3.0"
+    assert reply.remote_version_int == 130
+    assert reply.running_version == "1.2.3"
+    assert reply.running_version_int == 123
+
+
+def test_ota_reply_with_malformed_versions():
+    reply = parser.parse_ota_reply('{"ota_state":"check","ota_type":"auto","result":0,"remote_version":1.3}')
+
+    assert reply.remote_version is None
+    assert reply.remote_version_int is None
+    assert reply.running_version is None
+    assert reply.running_version_int is None
+
+
+@pytest.mark.parametrize("payload", [
+    '{"ota_type":"auto","result":0}',
+    '{"ota_state":"check","ota_type":"auto","result":"0"}',
+    'ok',
+])
+def test_malformed_ota_reply(payload):
+    assert parser.parse_ota_reply(payload) is None
@@ -0,0 +1,51 @@
+"""Tests of the rate limiter of the commands of a Pixie device."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.pixie.ratelimit import PRIORITY_HIGH, PRIORITY_NORMAL, PixieRateLimiter
+
+
+def send_in_order(commands):
+    """Acquire the limiter for (name, priority, channels) with the burst spent, return the send order."""
+    loop = asyncio.new_event_loop()
+    sent = []
+
+    async def acquire(limiter, name, priority, channels):
+        await limiter.async_acquire(priority, channels)
+        sent.append(name)
+
+    async def run():
+        limiter = PixieRateLimiter(loop, 100, 1)
+        await limiter.async_acquire()
+        await asyncio.gather(*(acquire(limiter, *command) for command in commands))
+
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+    return sent
+
+
+def test_on_off_go_ahead_of_other_channels():
+    assert send_in_order([
+        ("brightness 1", PRIORITY_NORMAL, (1,)),
+        ("off 0", PRIORITY_HIGH, (0,)),
+    ]) == ["off 0", "brightness 1"]
+
+
+def test_command_does_not_overtake_its_channel():
+    assert send_in_order([
+        ("on 0", PRIORITY_NORMAL, (0,)),
+        ("off 0", PRIORITY_HIGH, (0,)),
+    ]) == ["on 0", "off 0"]
+
+
+def test_all_channels_command_keeps_order_of_its_channels():
+    assert send_in_order([
+        ("brightness 2", PRIORITY_NORMAL, (2,)),
+        ("off all", PRIORITY_HIGH, (0, 1, 2, 3)),
+        ("on 3", PRIORITY_HIGH, (3,)),
+    ]) == ["brightness 2", "off all", "on 3"]
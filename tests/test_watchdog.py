@@ -0,0 +1,182 @@
+"""Tests of the availability watchdog of the Pixie devices."""
+from .common import load
+
+watchdog = load("watchdog")
+
+TIMEOUT = 16
+
+
+class FakeTimer:
+    def __init__(self, loop, when, callback):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeLoop:
+    """Event loop with a manual clock, only time() and call_later()."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self._timers = []
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback):
+        timer = FakeTimer(self, self.now + delay, callback)
+        self._timers.append(timer)
+        return timer
+
+    def advance(self, seconds, step=0.25):
+        """Move the clock forward, running the due timers on the way."""
+        end = self.now + seconds
+        while self.now < end:
+            self.now = min(end, self.now + step)
+            due = [timer for timer in self._timers if timer.when <= self.now and not timer.cancelled]
+            self._timers = [timer for timer in self._timers if timer not in due and not timer.cancelled]
+            for timer in sorted(due, key=lambda timer: timer.when):
+                timer.callback()
+
+
+class Device:
+    def __init__(self):
+        self.probes = 0
+        self.stale = 0
+
+    def on_probe(self):
+        self.probes += 1
+
+    def on_stale(self):
+        self.stale += 1
+
+
+def make_watchdog(probe=False):
+    loop = FakeLoop()
+    return loop, watchdog.PixieWatchdog(loop, TIMEOUT, probe)
+
+
+def test_touched_device_is_not_stale():
+    loop, dog = make_watchdog()
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    for _ in range(10):
+        loop.advance(TIMEOUT / 2)
+        assert dog.touch("abcdef") is False
+
+    assert device.stale == 0
+    assert dog.stale_devices() == 0
+
+
+def test_silent_device_is_stale():
+    loop, dog = make_watchdog()
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    loop.advance(TIMEOUT * 1.2)
+
+    assert device.probes == 0
+    assert device.stale == 1
+    assert dog.stale_devices() == 1
+
+
+def test_silent_device_is_probed_before_stale():
+    loop, dog = make_watchdog(probe=True)
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    loop.advance(TIMEOUT * 1.1)
+    assert device.probes == 1
+    assert device.stale == 0
+
+    loop.advance(TIMEOUT / 4)
+    assert device.probes == 1
+    assert device.stale == 1
+
+
+def test_answer_to_probe_keeps_device_available():
+    loop, dog = make_watchdog(probe=True)
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    loop.advance(TIMEOUT * 1.1)
+    assert dog.touch("abcdef") is False
+
+    loop.advance(TIMEOUT / 2)
+    assert device.probes == 1
+    assert device.stale == 0
+
+
+def test_recovered_device_is_watched_again():
+    loop, dog = make_watchdog()
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    loop.advance(TIMEOUT * 1.2)
+    assert dog.touch("abcdef") is True
+    assert dog.touch("abcdef") is False
+    assert dog.stale_devices() == 0
+
+    loop.advance(TIMEOUT * 1.2)
+    assert device.stale == 2
+
+
+def test_late_tick_catches_up():
+    loop, dog = make_watchdog()
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    # A blocked event loop runs the tick long after it was due
+    loop.advance(TIMEOUT * 3, step=TIMEOUT * 3)
+
+    assert device.stale == 1
+
+
+def test_device_due_in_a_later_round():
+    loop, dog = make_watchdog()
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    # Touching moves the deadline past a whole round of the wheel
+    for _ in range(8):
+        loop.advance(TIMEOUT * 0.9)
+        dog.touch("abcdef")
+
+    assert device.stale == 0
+    loop.advance(TIMEOUT * 1.2)
+    assert device.stale == 1
+
+
+def test_removed_device_is_not_reported():
+    loop, dog = make_watchdog()
+    device = Device()
+    dog.add("abcdef", device.on_probe, device.on_stale)
+
+    dog.remove("abcdef")
+    loop.advance(TIMEOUT * 2)
+
+    assert device.stale == 0
+    assert dog.touch("abcdef") is False
+
+
+def test_readded_device_gets_a_new_deadline():
+    loop, dog = make_watchdog()
+    old = Device()
+    new = Device()
+    dog.add("abcdef", old.on_probe, old.on_stale)
+
+    loop.advance(TIMEOUT * 0.75)
+    dog.remove("abcdef")
+    dog.add("abcdef", new.on_probe, new.on_stale)
+
+    loop.advance(TIMEOUT * 0.75)
+    assert old.stale == 0
+    assert new.stale == 0
+
+    loop.advance(TIMEOUT * 0.5)
+    assert old.stale == 0
+    assert new.stale == 1